@@ -1,38 +1,174 @@
 import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
 import cv2
 import numpy as np
+import torch
+from PIL import Image
+from torchvision.ops import nms
 import matplotlib.pyplot as plt
-from ultralytics import YOLO
+
+from AI.backends import load_model
+
+# JPEG DCT-scaled decodes, coarsest first
+REDUCED_DECODE_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                        (2, cv2.IMREAD_REDUCED_COLOR_2))
 
 class ClassificationModelManager:
     """
-    Manages multiple classification models for different food categories."""
-    def __init__(self, classification_paths: dict):
-        self.classification_models = {}
-        for category, path in classification_paths.items():
-            try:
-                self.classification_models[category] = YOLO(path)
-            except Exception as e:
-                print(f"Error loading model for category '{category}': {e}")
-                self.classification_models[category] = None
-        
+    Manages multiple classification models for different food categories.
+
+    By default every model is loaded up front. With `lazy=True` a model is
+    loaded on first use, and when `memory_budget_mb` is set the least recently
+    used models are evicted to stay within it. Models in `pinned` are always
+    loaded at start and never evicted.
+
+    Each model is served by `backend` unless overridden in `backend_overrides`
+    (category -> "torch" | "onnx" | "openvino")."""
+    def __init__(self, classification_paths: dict, lazy: bool = False,
+                 memory_budget_mb: float | None = None, pinned: tuple = (), backend: str = "torch",
+                 backend_overrides: dict | None = None, intra_op_threads: int | None = None,
+                 quantized: bool = False):
+        self.classification_paths = classification_paths
+        self.backend = backend
+        self.backend_overrides = backend_overrides or {}
+        self.intra_op_threads = intra_op_threads
+        self.quantized = quantized
+        self.memory_budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb else None
+        self.pinned = set(pinned)
+
+        self.classification_models = OrderedDict()  # loaded models, least recently used first
+        self._model_sizes = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+        self._load_locks = {category: threading.Lock() for category in classification_paths}
+        self.usage_stats = {
+            category: {"requests": 0, "loads": 0, "evictions": 0, "load_seconds": 0.0}
+            for category in classification_paths
+        }
+
+        for category in classification_paths:
+            if not lazy or category in self.pinned:
+                self._load(category)
+
+    def _load(self, category: str):
+        path = self.classification_paths[category]
+        started_at = time.perf_counter()
+        try:
+            model = load_model(path, task="classify", backend=self.backend_overrides.get(category, self.backend),
+                               intra_op_threads=self.intra_op_threads, quantized=self.quantized)
+        except Exception as e:
+            print(f"Error loading model for category '{category}': {e}")
+            with self._lock:
+                self._failed.add(category)
+            return None
+
+        with self._lock:
+            stats = self.usage_stats[category]
+            stats["loads"] += 1
+            stats["load_seconds"] += time.perf_counter() - started_at
+            self.classification_models[category] = model
+            self._model_sizes[category] = self._estimate_size(model, path)
+            self._evict_over_budget(keep=category)
+        return model
+
+    @staticmethod
+    def _estimate_size(model, path: str) -> int:
+        """Bytes held by the model weights, falling back to the file size."""
+        try:
+            return sum(p.numel() * p.element_size() for p in model.model.parameters())
+        except Exception:
+            return os.path.getsize(path)
+
+    def _evict_over_budget(self, keep: str):
+        if self.memory_budget is None:
+            return
+        for category in list(self.classification_models):
+            if self.loaded_bytes() <= self.memory_budget:
+                break
+            if category == keep or category in self.pinned:
+                continue
+            del self.classification_models[category]
+            del self._model_sizes[category]
+            self.usage_stats[category]["evictions"] += 1
+
+    def loaded_bytes(self) -> int:
+        return sum(self._model_sizes.values())
+
+    def has_model(self, category: str) -> bool:
+        """Whether a model is configured for the category and did not fail to load."""
+        return category in self.classification_paths and category not in self._failed
+
     def get_model(self, category: str):
-        """Returns a specific classification model based on the category."""
-        return self.classification_models.get(category)
-    
+        """Returns a specific classification model based on the category, loading it if needed."""
+        if not self.has_model(category):
+            return None
+
+        with self._lock:
+            self.usage_stats[category]["requests"] += 1
+            model = self.classification_models.get(category)
+            if model is not None:
+                self.classification_models.move_to_end(category)
+                return model
+
+        with self._load_locks[category]:
+            # Another thread may have loaded it while we waited
+            model = self.classification_models.get(category)
+            if model is not None:
+                return model
+            return self._load(category)
+
     def get_all_models(self):
-        """Returns all classification models. (dictionary)"""
-        return self.classification_models
+        """Returns all currently loaded classification models. (dictionary)"""
+        return dict(self.classification_models)
+
+    def get_states(self) -> dict:
+        """Returns the load state per category: "loaded", "failed" or "not_loaded" (lazy or evicted)."""
+        with self._lock:
+            return {
+                category: "loaded" if category in self.classification_models
+                else "failed" if category in self._failed
+                else "not_loaded"
+                for category in self.classification_paths
+            }
+
+    def get_usage_stats(self) -> dict:
+        """Returns per-category usage statistics including load state."""
+        with self._lock:
+            return {
+                category: {
+                    **stats,
+                    "loaded": category in self.classification_models,
+                    "pinned": category in self.pinned,
+                    "size_bytes": self._model_sizes.get(category, 0),
+                }
+                for category, stats in self.usage_stats.items()
+            }
     
 class FoodDetectionModel:
     def __init__(self, detection_model_path: str, classification_config: dict,
-                 detection_id_to_name: str, det_to_cls_group: str):
+                 detection_id_to_name: str, det_to_cls_group: str, classification_workers: int = 1,
+                 lazy_classification: bool = False, classification_memory_budget_mb: float | None = None,
+                 pinned_groups: tuple = (), backend: str = "torch", backend_overrides: dict | None = None,
+                 intra_op_threads: int | None = None, quantized: bool = False,
+                 cascade_skip_conf: float | None = None, cascade_skip_conf_overrides: dict | None = None,
+                 cascade_skip_single_class: bool = False):
         
-        self.detection_model = YOLO(detection_model_path)
-
-        self.cls_manager = ClassificationModelManager(classification_config)
+        # Backend per model, "detection" selects the detector and group names the classifiers
+        backend_overrides = backend_overrides or {}
+        self.detection_model = load_model(detection_model_path, task="detect",
+                                          backend=backend_overrides.get("detection", backend),
+                                          intra_op_threads=intra_op_threads, quantized=quantized)
 
-        self.classification_models = self.cls_manager.get_all_models()
+        self.cls_manager = ClassificationModelManager(classification_config, lazy=lazy_classification,
+                                                      memory_budget_mb=classification_memory_budget_mb,
+                                                      pinned=pinned_groups, backend=backend,
+                                                      backend_overrides=backend_overrides,
+                                                      intra_op_threads=intra_op_threads, quantized=quantized)
 
         with open(detection_id_to_name, 'r') as f:
             self.detection_id_to_name = json.load(f)
@@ -42,143 +178,455 @@ class FoodDetectionModel:
         with open(det_to_cls_group, 'r') as f:
             self.det_to_cls_group = json.load(f)
 
-    def _expand_bbox(self, bbox, image_shape, scale=1.1):
-        """Expand bounding box slightly while staying within image bounds."""
-        x1, y1, x2, y2 = bbox
-        w, h = x2 - x1, y2 - y1
-        cx, cy = x1 + w / 2, y1 + h / 2
-        new_w, new_h = w * scale, h * scale
+        # Class id -> classification group (first group listing the class, like the scan it replaces)
+        class_to_group = {}
+        for group_name, class_list in self.det_to_cls_group.items():
+            for class_name in class_list:
+                class_to_group.setdefault(class_name, group_name)
+        num_classes = max(self.name_to_id.values(), default=-1) + 1
+        self._class_id_to_group = [None] * num_classes
+        for class_name, class_id in self.name_to_id.items():
+            self._class_id_to_group[class_id] = class_to_group.get(class_name)
 
-        x1n = max(0, int(cx - new_w / 2))
-        y1n = max(0, int(cy - new_h / 2))
-        x2n = min(image_shape[1] - 1, int(cx + new_w / 2))
-        y2n = min(image_shape[0] - 1, int(cy + new_h / 2))
+        # YOLO predictors are not thread-safe, serialize calls per model (None = detector)
+        self._model_locks = {None: threading.Lock()}
+        self._model_locks.update({group: threading.Lock() for group in classification_config})
 
-        return [x1n, y1n, x2n, y2n]
-    
-    def run(self, image_path: str, conf_threshold=0.3, det_imgsz=1024, verbose=True):
-        """Run detection and classification on the input image."""
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError(f"Image at path '{image_path}' could not be loaded.")
-        
-        ### DETECTION ###
-        det_results = self.detection_model.predict(source=image, imgsz=det_imgsz, conf=conf_threshold, agnostic_nms=True, save=False, verbose=False)
+        # Pool for running independent group classifiers concurrently
+        self._group_pool = None
+        if classification_workers > 1:
+            self._group_pool = ThreadPoolExecutor(max_workers=classification_workers, thread_name_prefix="cls-group")
 
-        all_boxes = []
-        final_outputs = []
-        classes_detected = set()
+        self._cascade_lock = threading.Lock()
+        # Moving average of classifier seconds per crop, per group, to tell whether a group fits a deadline
+        self._seconds_per_crop = {}
+        self.cascade_stats = {group: {"classified": 0, "skipped": 0} for group in classification_config}
+        self.set_cascade_policy(cascade_skip_conf, cascade_skip_conf_overrides, cascade_skip_single_class)
 
-        ### CLASSIFICATION ###
+    def set_cascade_policy(self, skip_conf: float | None = None, skip_conf_overrides: dict | None = None,
+                           skip_single_class: bool = False):
+        """Configure when a detection skips its group classifier and keeps the detector's class:
+        when its det_conf_score is at least the group's threshold (`skip_conf_overrides` per group,
+        `skip_conf` otherwise, None never skips), or when the group has a single class."""
+        self.cascade_skip_conf = skip_conf
+        self.cascade_skip_conf_overrides = dict(skip_conf_overrides or {})
+        self._single_class_groups = {group for group, classes in self.det_to_cls_group.items()
+                                     if len(classes) == 1} if skip_single_class else set()
 
-        for det in det_results:
-            boxes = det.boxes.xyxy.cpu().numpy()
-            class_ids = det.boxes.cls.cpu().numpy()
-            scores = det.boxes.conf.cpu().numpy()
-
-            for i, box in enumerate(boxes):
-                x1, y1, x2, y2 = map(int, box)
-                det_class_id = int(class_ids[i])
-                det_conf_score = float(scores[i])
-                det_class_name = self.detection_id_to_name[str(det_class_id)]
-
-                all_boxes.append((x1, y1, x2, y2, det_class_name, det_conf_score))
-
-                # --- Find which segmentation model to use ---
-                seg_group = None
-                for group_name, class_list in self.det_to_cls_group.items():
-                    if det_class_name in class_list:
-                        seg_group = group_name
-                        if verbose:
-                            print(f"Detection '{det_class_name}' mapped to classification group '{seg_group}'")
-                        break
-                if seg_group is None:
-                    if verbose:
-                        print(f"No classification group found for detection '{det_class_name}'. Skipping classification.")
-                    
-                    final_outputs.append({
-                        "pred_class_name": det_class_name,
-                        "pred_class_id": det_class_id,
-                        "bbox": [x1, y1, x2, y2],
-                        "det_class_name": det_class_name,
-                        "det_conf_score": det_conf_score,
-                        "cls_group": None,
-                        "top5_cls_results": []
+    def _skips_classifier(self, group: str, det_conf_score: float) -> bool:
+        if group in self._single_class_groups:
+            return True
+        threshold = self.cascade_skip_conf_overrides.get(group, self.cascade_skip_conf)
+        return threshold is not None and det_conf_score >= threshold
+
+    def get_cascade_stats(self) -> dict:
+        """Per-group count of detections classified and skipped by the cascade policy."""
+        with self._cascade_lock:
+            return {
+                group: {**stats, "skip_rate": stats["skipped"] / max(1, stats["classified"] + stats["skipped"])}
+                for group, stats in self.cascade_stats.items()
+            }
+
+    def _expand_bboxes(self, boxes: np.ndarray, image_shape, scale=1.1) -> np.ndarray:
+        """Expand (N, 4) bounding boxes slightly while staying within image bounds."""
+        boxes = boxes.astype(np.float64)
+        half = (boxes[:, 2:] - boxes[:, :2]) * scale / 2
+        centers = boxes[:, :2] + (boxes[:, 2:] - boxes[:, :2]) / 2
+
+        # astype truncates toward zero, same as int()
+        expanded = np.hstack((centers - half, centers + half)).astype(np.int64)
+        upper = np.array([image_shape[1] - 1, image_shape[0] - 1])
+        expanded[:, :2] = np.maximum(expanded[:, :2], 0)
+        expanded[:, 2:] = np.minimum(expanded[:, 2:], upper)
+        return expanded
+    
+    def _classify_crops(self, group: str, crops: list, timings=None):
+        """Classify all crops of one group in a single forward pass. Returns top5 list per crop,
+        or None if the group's model could not be loaded."""
+        start = time.perf_counter()
+        with self._model_locks[group]:
+            cls_model = self.cls_manager.get_model(group)
+            if cls_model is None:
+                return None
+            cls_results = cls_model.predict(source=crops, verbose=False)
+        seconds = time.perf_counter() - start
+        previous = self._seconds_per_crop.get(group)
+        per_crop = seconds / len(crops)
+        self._seconds_per_crop[group] = per_crop if previous is None else 0.8 * previous + 0.2 * per_crop
+        if timings is not None:
+            timings.add(f"cls_{group}", seconds, (f"crops_{group}", len(crops)))
+
+        top5_per_crop = []
+        for cls_res in cls_results:
+            top5 = []
+            if cls_res.probs is not None:
+                names = cls_res.names
+                top5cls_ids = cls_res.probs.top5
+                top5probs = cls_res.probs.top5conf
+
+                for idx, prob in zip(top5cls_ids, top5probs):
+                    top5.append({
+                        "class_name": names[idx],
+                        "probability": float(prob)
                     })
-                    classes_detected.add(det_class_name)
-                    continue
+            top5_per_crop.append(top5)
+        return top5_per_crop
+
+    def _on_time(self, group: str, items: list, deadlines) -> list:
+        """The (crop_key, crop) items of a group whose image deadline (time.monotonic(), None = none)
+        leaves enough time to classify them, estimated from the group's recent seconds per crop."""
+        if deadlines is None:
+            return items
+        estimate = self._seconds_per_crop.get(group, 0.0) * len(items)
+        now = time.monotonic()
+        return [item for item in items
+                if deadlines[item[0][0]] is None or now + estimate <= deadlines[item[0][0]]]
+
+    def _classify_groups(self, crops_by_group: dict, on_group_done=None, timings=None, deadlines=None) -> tuple:
+        """Run each group's classifier once over its crops, groups concurrently if enabled.
+        Returns ({crop_key: top5}, {crop_key, ...} left out to meet `deadlines`).
+        `on_group_done(group, {crop_key: top5})` is called as each group finishes."""
+        results = {}
+        late = set()
+
+        def on_time(group, items):
+            kept = self._on_time(group, items, deadlines)
+            if len(kept) < len(items):
+                kept_keys = {key for key, _ in kept}
+                late.update(key for key, _ in items if key not in kept_keys)
+            return kept
+
+        def collect(group, items, top5_per_crop):
+            if top5_per_crop is None:
+                return
+            group_results = {index: top5 for (index, _), top5 in zip(items, top5_per_crop)}
+            results.update(group_results)
+            if on_group_done is not None:
+                on_group_done(group, group_results)
+
+        if self._group_pool is None or len(crops_by_group) < 2:
+            # Checked before each group, the time spent on the previous ones counts
+            for group, items in crops_by_group.items():
+                items = on_time(group, items)
+                if items:
+                    collect(group, items, self._classify_crops(group, [crop for _, crop in items], timings))
+        else:
+            futures = {}
+            for group, items in crops_by_group.items():
+                items = on_time(group, items)
+                if items:
+                    future = self._group_pool.submit(self._classify_crops, group, [crop for _, crop in items], timings)
+                    futures[future] = (group, items)
+            for future in as_completed(futures):
+                collect(*futures[future], future.result())
+        return results, late
+
+    @staticmethod
+    def load_image(image):
+        """Returns a BGR image from a path or an encoded in-memory buffer,
+        or passes an already decoded image through."""
+        if isinstance(image, np.ndarray):
+            return image
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            loaded = cv2.imdecode(np.frombuffer(memoryview(image), dtype=np.uint8), cv2.IMREAD_COLOR)
+            if loaded is None:
+                raise ValueError("Image buffer could not be decoded.")
+            return loaded
+        loaded = cv2.imread(image)
+        if loaded is None:
+            raise ValueError(f"Image at path '{image}' could not be loaded.")
+        return loaded
+
+    @staticmethod
+    def load_image_reduced(image, min_side: int):
+        """Decodes an encoded JPEG at 1/8, 1/4 or 1/2 resolution with DCT scaling, whichever is the smallest
+        that keeps the long side at least `min_side`. EXIF orientation is applied like in `load_image`.
+        Returns (image, scale) where scale maps the image back to full-resolution coordinates.
+        Anything else is loaded by `load_image` at scale 1."""
+        if not isinstance(image, (bytes, bytearray, memoryview)) or bytes(memoryview(image)[:2]) != b"\xff\xd8":
+            return FoodDetectionModel.load_image(image), 1
+        try:
+            with Image.open(BytesIO(image)) as header:
+                long_side = max(header.size)
+        except Exception:
+            long_side = 0
+
+        for scale, flag in REDUCED_DECODE_FLAGS:
+            if long_side // scale >= min_side:
+                loaded = cv2.imdecode(np.frombuffer(memoryview(image), dtype=np.uint8), flag)
+                if loaded is None:
+                    raise ValueError("Image buffer could not be decoded.")
+                return loaded, scale
+        return FoodDetectionModel.load_image(image), 1
+
+    def detect(self, images: list, conf_threshold=0.3, det_imgsz=1024, verbose=True, timings=None) -> list:
+        """Run the detector once over all (decoded) images. Returns a list of detections per image,
+        each detection being (x1, y1, x2, y2, det_class_id, det_class_name, det_conf_score, cls_group).
+        `timings`, if given, gets `add(stage, seconds, (count_name, count))` calls for each stage."""
+        if not images:
+            return []
 
-                expanded_box = self._expand_bbox((x1, y1, x2, y2), image.shape)
-                ex1, ey1, ex2, ey2 = expanded_box
-                crop_img = image[ey1:ey2, ex1:ex2].copy()
+        # A single image keeps ultralytics' minimal rectangular letterbox
+        source = images if len(images) > 1 else images[0]
+        start = time.perf_counter()
+        with self._model_locks[None]:
+            det_results = self.detection_model.predict(source=source, imgsz=det_imgsz, conf=conf_threshold, agnostic_nms=True, save=False, verbose=False)
+        if timings is not None:
+            timings.add("detection", time.perf_counter() - start, ("boxes", sum(len(det.boxes) for det in det_results)))
 
-                cls_model = self.classification_models.get(seg_group)
-                if cls_model is None:
-                    if verbose:
+        return [self._build_detections(det.boxes.xyxy.cpu().numpy(), det.boxes.cls.cpu().numpy(),
+                                       det.boxes.conf.cpu().numpy(), verbose)
+                for det in det_results]
+
+    def _build_detections(self, boxes: np.ndarray, class_ids: np.ndarray, scores: np.ndarray, verbose: bool) -> list:
+        """Detection tuples of one image from the detector's (N, 4) boxes, class ids and scores."""
+        boxes = boxes.astype(np.int64).tolist()
+        class_ids = class_ids.astype(np.int64).tolist()
+        groups = [self._class_id_to_group[class_id] if class_id < len(self._class_id_to_group) else None
+                  for class_id in class_ids]
+
+        detections = []
+        for (x1, y1, x2, y2), det_class_id, det_conf_score, seg_group in zip(boxes, class_ids, scores.tolist(), groups):
+            det_class_name = self.detection_id_to_name[str(det_class_id)]
+
+            if verbose:
+                if seg_group is None:
+                    print(f"No classification group found for detection '{det_class_name}'. Skipping classification.")
+                else:
+                    print(f"Detection '{det_class_name}' mapped to classification group '{seg_group}'")
+                    if not self.cls_manager.has_model(seg_group):
                         print(f"No classification model found for group '{seg_group}'. Skipping classification.")
-                    
-                    final_outputs.append({
-                        "pred_class_name": det_class_name,
-                        "pred_class_id": det_class_id,
-                        "bbox": [x1, y1, x2, y2],
-                        "det_class_name": det_class_name,
-                        "det_conf_score": det_conf_score,
-                        "cls_group": seg_group,
-                        "top5_cls_results": []
-                    })
-                    classes_detected.add(det_class_name)
+
+            detections.append((x1, y1, x2, y2, det_class_id, det_class_name, det_conf_score, seg_group))
+        return detections
+
+    @staticmethod
+    def _tile_starts(length: int, tile_size: int, stride: int) -> list:
+        """Tile offsets along one side, the last tile aligned with the image edge."""
+        if length <= tile_size:
+            return [0]
+        return list(range(0, length - tile_size, stride)) + [length - tile_size]
+
+    def detect_tiled(self, images: list, conf_threshold=0.3, tile_size=640, overlap=0.2, nms_iou=0.5,
+                     max_batch=32, verbose=True, timings=None) -> list:
+        """Sliced detection for large images: every image is cut into overlapping tiles at the detector's
+        native size, and run whole at that size too so items larger than a tile stay in one piece.
+        All tiles run batched (`max_batch` at a time), and the boxes are merged back in full-image
+        coordinates with class-agnostic NMS. Returns detections per image like `detect`."""
+        if not images:
+            return []
+
+        sources, origins = [], []  # origin: (image_index, x0, y0) of each source
+        for image_index, image in enumerate(images):
+            height, width = image.shape[:2]
+            sources.append(image)
+            origins.append((image_index, 0, 0))
+            if max(height, width) <= tile_size:
+                continue
+            stride = max(1, int(tile_size * (1 - overlap)))
+            for y0 in self._tile_starts(height, tile_size, stride):
+                for x0 in self._tile_starts(width, tile_size, stride):
+                    sources.append(image[y0:y0 + tile_size, x0:x0 + tile_size])
+                    origins.append((image_index, x0, y0))
+
+        start = time.perf_counter()
+        det_results = []
+        with self._model_locks[None]:
+            for i in range(0, len(sources), max_batch):
+                batch = sources[i:i + max_batch]
+                det_results.extend(self.detection_model.predict(
+                    source=batch if len(batch) > 1 else batch[0], imgsz=tile_size, conf=conf_threshold,
+                    agnostic_nms=True, save=False, verbose=False
+                ))
+
+        boxes = [[] for _ in images]
+        for (image_index, x0, y0), det in zip(origins, det_results):
+            data = det.boxes.data.cpu()  # x1, y1, x2, y2, conf, cls
+            boxes[image_index].append(data + torch.tensor([x0, y0, x0, y0, 0, 0], dtype=data.dtype))
+
+        detections_per_image = []
+        for image_boxes in boxes:
+            data = torch.cat(image_boxes)
+            data = data[nms(data[:, :4], data[:, 4], nms_iou)]  # sorted by confidence, like the detector output
+            detections_per_image.append(self._build_detections(data[:, :4].numpy(), data[:, 5].numpy(),
+                                                               data[:, 4].numpy(), verbose))
+
+        if timings is not None:
+            timings.add("detection", time.perf_counter() - start,
+                        ("boxes", sum(len(detections) for detections in detections_per_image)))
+        return detections_per_image
+
+    def _merge_outputs(self, detections: list, top5_by_detection: dict, degraded=()) -> list:
+        """Build final outputs for one image, keeping the most confident prediction per class.
+        A replaced prediction moves to the end of the outputs. Outputs of the detection indices
+        in `degraded` (classifier left out to meet a deadline) are marked with "degraded": True."""
+        final_outputs = {}  # insertion-ordered, slot -> output
+        slots_by_name = {}  # pred_class_name -> its slots in output order
+        for index, (x1, y1, x2, y2, det_class_id, det_class_name, det_conf_score, seg_group) in enumerate(detections):
+            top5 = top5_by_detection.get(index)
+            if top5 is None:
+                final_outputs[index] = {
+                    "pred_class_name": det_class_name,
+                    "pred_class_id": det_class_id,
+                    "bbox": [x1, y1, x2, y2],
+                    "det_class_name": det_class_name,
+                    "det_conf_score": det_conf_score,
+                    "cls_group": seg_group,
+                    "top5_cls_results": []
+                }
+                slots_by_name.setdefault(det_class_name, []).append(index)
+                continue
+
+            new_prob = top5[0]["probability"] if top5 else det_conf_score
+            class_name = top5[0]["class_name"] if top5 else det_class_name
+
+            slots = slots_by_name.setdefault(class_name, [])
+            if slots:
+                # exists — compare probability with the first output of this class
+                existing = final_outputs[slots[0]]
+                existing_top5 = existing["top5_cls_results"]
+                existing_prob = existing_top5[0]["probability"] if existing_top5 else existing["det_conf_score"]
+                if new_prob <= existing_prob:
                     continue
+                del final_outputs[slots.pop(0)]
 
-                cls_results = cls_model.predict(source=crop_img, verbose=False)
-
-                ## Process classification results
-                top5 = []
-                if cls_results and cls_results[0].probs is not None:
-                    cls_res = cls_results[0]
-
-                    names = cls_res.names
-                    top5cls_ids = cls_res.probs.top5
-                    top5probs = cls_res.probs.top5conf
-
-                    for idx, prob in zip(top5cls_ids, top5probs):
-                        top5.append({
-                            "class_name": names[idx],
-                            "probability": float(prob)
-                        })
-                new_prob = top5[0]["probability"] if top5 else det_conf_score
-                class_name = top5[0]["class_name"] if top5 else det_class_name
-
-                # Check for existing class in final outputs
-                existing_index = next(
-                    (i for i, item in enumerate(final_outputs) if item["pred_class_name"] == class_name),
-                    None
-                )
-
-                if existing_index is None:
-                    final_outputs.append({
-                        "pred_class_name": class_name,
-                        "pred_class_id": self.name_to_id.get(class_name, det_class_id),
-                        "bbox": [x1, y1, x2, y2],
-                        "det_class_name": det_class_name,
-                        "det_conf_score": det_conf_score,
-                        "cls_group": seg_group,
-                        "top5_cls_results": top5
-                    })
+            final_outputs[index] = {
+                "pred_class_name": class_name,
+                "pred_class_id": self.name_to_id.get(class_name, det_class_id),
+                "bbox": [x1, y1, x2, y2],
+                "det_class_name": det_class_name,
+                "det_conf_score": det_conf_score,
+                "cls_group": seg_group,
+                "top5_cls_results": top5
+            }
+            if index in degraded:
+                final_outputs[index]["degraded"] = True
+            slots.append(index)
+
+        return list(final_outputs.values())
+
+    def classify(self, images: list, detections_per_image: list, on_group_done=None, timings=None,
+                 full_resolution=None, min_crop_side=64, deadlines=None) -> list:
+        """Run the group classifiers over the detections of all (decoded) images.
+        Every group classifier runs once over the crops of all images. Returns final outputs per image.
+        `on_group_done(group, {(image_index, index): top5})` is called as each group classifier finishes.
+
+        For images decoded at reduced resolution, `full_resolution` holds per image a (scale, load_full)
+        pair (None otherwise). Boxes with a side under `min_crop_side` are then cropped from the image
+        returned by `load_full()` instead, so tiny items keep their detail.
+
+        `deadlines` holds per image a time.monotonic() deadline (or None). A group classifier that
+        would not finish in time is left out for that image's crops, which keep the detector's class
+        like a cascade skip and are marked "degraded" in the outputs."""
+        # Collect crops per group across all images so every classifier runs once
+        start = time.perf_counter()
+        crops_by_group = {}
+        skipped_by_group = {}  # confident detections keep the detector's class
+        for image_index, (image, detections) in enumerate(zip(images, detections_per_image)):
+            indices = []
+            for index, (_, _, _, _, _, det_class_name, det_conf_score, seg_group) in enumerate(detections):
+                if seg_group is None or not self.cls_manager.has_model(seg_group):
+                    continue
+                if self._skips_classifier(seg_group, det_conf_score):
+                    skipped_by_group.setdefault(seg_group, {})[(image_index, index)] = [
+                        {"class_name": det_class_name, "probability": det_conf_score}
+                    ]
+                else:
+                    indices.append(index)
+            if not indices:
+                continue
+            expanded = self._expand_bboxes(np.array([detections[index][:4] for index in indices]), image.shape)
+            full = full_resolution[image_index] if full_resolution else None
+            for index, (ex1, ey1, ex2, ey2) in zip(indices, expanded.tolist()):
+                if full is not None and min(ex2 - ex1, ey2 - ey1) < min_crop_side:
+                    scale, load_full = full
+                    crop = load_full()[ey1 * scale:ey2 * scale, ex1 * scale:ex2 * scale].copy()
                 else:
-                    # exists — compare probability
-                    existing_prob = final_outputs[existing_index]["top5_cls_results"][0]["probability"]
-
-                    if new_prob > existing_prob:
-                        # More confident prediction
-                        final_outputs.pop(existing_index)
-                        final_outputs.append({
-                            "pred_class_name": class_name,
-                            "pred_class_id": self.name_to_id.get(class_name, det_class_id),
-                            "bbox": [x1, y1, x2, y2],
-                            "det_class_name": det_class_name,
-                            "det_conf_score": det_conf_score,
-                            "cls_group": seg_group,
-                            "top5_cls_results": top5
-                        })
-                        
-        return final_outputs
\ No newline at end of file
+                    crop = image[ey1:ey2, ex1:ex2].copy()
+                crops_by_group.setdefault(detections[index][7], []).append(((image_index, index), crop))
+
+        if timings is not None:
+            timings.add("crops", time.perf_counter() - start)
+
+        with self._cascade_lock:
+            for group, items in crops_by_group.items():
+                self.cascade_stats[group]["classified"] += len(items)
+            for group, skipped in skipped_by_group.items():
+                self.cascade_stats[group]["skipped"] += len(skipped)
+
+        top5_by_detection = {}
+        for group, skipped in skipped_by_group.items():
+            top5_by_detection.update(skipped)
+            if on_group_done is not None:
+                on_group_done(group, skipped)
+
+        classified, late = self._classify_groups(crops_by_group, on_group_done, timings, deadlines)
+        top5_by_detection.update(classified)
+
+        degraded_per_image = [set() for _ in images]
+        for group, items in crops_by_group.items():
+            degraded = {}
+            for key, _ in items:
+                if key in late:
+                    detection = detections_per_image[key[0]][key[1]]
+                    degraded[key] = [{"class_name": detection[5], "probability": detection[6]}]
+                    degraded_per_image[key[0]].add(key[1])
+            if degraded:
+                top5_by_detection.update(degraded)
+                if on_group_done is not None:
+                    on_group_done(group, degraded)
+
+        top5_per_image = [{} for _ in images]
+        for (image_index, index), top5 in top5_by_detection.items():
+            top5_per_image[image_index][index] = top5
+
+        return [self._merge_outputs(detections, image_top5, degraded)
+                for detections, image_top5, degraded in zip(detections_per_image, top5_per_image, degraded_per_image)]
+
+    def warm_up(self, det_imgsizes=(1024,), cls_imgsz=224):
+        """Run dummy inferences so the first real request doesn't pay graph and allocator warm-up.
+        The detector is warmed at every size in `det_imgsizes`, classifiers only if already loaded."""
+        for det_imgsz in det_imgsizes:
+            self.detect([np.zeros((det_imgsz, det_imgsz, 3), dtype=np.uint8)], det_imgsz=det_imgsz, verbose=False)
+
+        crop = np.zeros((cls_imgsz, cls_imgsz, 3), dtype=np.uint8)
+        for group in self.cls_manager.get_all_models():
+            self._classify_crops(group, [crop])
+
+    def share_memory(self):
+        """Fuse the loaded torch models and move their weights to shared memory, so processes forked
+        afterwards map the same pages instead of copying them. Fusing here keeps ultralytics from
+        replacing the weights with private copies on the first prediction in each process.
+        Exported (onnx/openvino) models are built by their runtime on first use and are not shared."""
+        for yolo in (self.detection_model, *self.cls_manager.get_all_models().values()):
+            module = getattr(yolo, "model", None)
+            if hasattr(module, "share_memory"):
+                module.fuse(verbose=False)
+                module.share_memory()
+
+    def get_states(self) -> dict:
+        """Load state of every model, the detector under "detection"."""
+        return {"detection": "loaded", **self.cls_manager.get_states()}
+
+    def run_batch(self, images: list, conf_threshold=0.3, det_imgsz=1024, verbose=True, det_mode="full") -> list:
+        """Run detection and classification on several images (paths, encoded buffers or BGR arrays) at once.
+        The detector runs once over all images and every group classifier runs once over
+        the crops of all images. With det_mode="tiled" large images are detected in
+        det_imgsz tiles (see `detect_tiled`). Returns final outputs per image."""
+        images = [self.load_image(image) for image in images]
+        if not images:
+            return []
+
+        ### DETECTION ###
+        if det_mode == "tiled":
+            detections_per_image = self.detect_tiled(images, conf_threshold, tile_size=det_imgsz, verbose=verbose)
+        else:
+            detections_per_image = self.detect(images, conf_threshold, det_imgsz, verbose)
+
+        ### CLASSIFICATION ###
+        return self.classify(images, detections_per_image)
+
+    def run(self, image, conf_threshold=0.3, det_imgsz=1024, verbose=True, det_mode="full"):
+        """Run detection and classification on the input image (path, encoded buffer or BGR array)."""
+        return self.run_batch([image], conf_threshold=conf_threshold, det_imgsz=det_imgsz, verbose=verbose,
+                              det_mode=det_mode)[0]
@@ -0,0 +1,110 @@
+from functools import partial
+from pathlib import Path
+
+from ultralytics import YOLO
+
+SUPPORTED_BACKENDS = ("torch", "onnx", "openvino")
+
+
+QUANTIZABLE_BACKENDS = ("onnx", "openvino")
+
+
+def exported_model_path(weights_path: str, backend: str, quantized: bool = False) -> Path:
+    """Where the exported artifact for a .pt checkpoint lives (next to the original).
+    Quantized artifacts use the names ultralytics gives INT8 exports."""
+    weights = Path(weights_path)
+    int8 = "_int8" if quantized else ""
+    if backend == "onnx":
+        return weights.with_name(f"{weights.stem}{int8}.onnx")
+    if backend == "openvino":
+        return weights.parent / f"{weights.stem}{int8}_openvino_model"
+    return weights
+
+
+def export_model(weights_path: str, backend: str, imgsz: int | None = None, **export_kwargs) -> Path:
+    """Exports a .pt checkpoint for the given backend once, re-exporting only if the checkpoint is newer."""
+    target = exported_model_path(weights_path, backend)
+    if backend == "torch":
+        return target
+    if target.exists() and target.stat().st_mtime >= Path(weights_path).stat().st_mtime:
+        return target
+
+    print(f"Exporting '{weights_path}' for {backend} backend...")
+    kwargs = {"dynamic": True, "verbose": False, **export_kwargs}
+    if imgsz is not None:
+        kwargs["imgsz"] = imgsz
+    exported = YOLO(weights_path).export(format=backend, **kwargs)
+    return Path(exported)
+
+
+def load_model(weights_path: str, task: str, backend: str = "torch", intra_op_threads: int | None = None,
+               imgsz: int | None = None, quantized: bool = False, **export_kwargs) -> YOLO:
+    """
+    Loads a model for one of the CPU inference backends. Non-torch backends are
+    exported from the .pt checkpoint on first use and served through the same
+    ultralytics YOLO interface, so pre- and post-processing stay identical.
+
+    With `quantized=True` the INT8 artifact produced by AI/quantize.py is loaded
+    instead. It needs calibration data, so it is never exported here; if it is
+    missing the float model is used.
+    """
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported inference backend '{backend}', expected one of {SUPPORTED_BACKENDS}")
+
+    if backend == "torch":
+        if quantized:
+            print(f"INT8 models need the onnx or openvino backend, using the float '{weights_path}'.")
+        model = YOLO(weights_path)
+        if intra_op_threads:
+            import torch
+
+            # Process-wide setting, shared by every torch model in this worker
+            torch.set_num_threads(intra_op_threads)
+        return model
+
+    exported = exported_model_path(weights_path, backend, quantized=True) if quantized else None
+    if exported is not None and not exported.exists():
+        print(f"No INT8 {backend} model at '{exported}', using the float model instead.")
+        exported = None
+    if exported is None:
+        exported = export_model(weights_path, backend, imgsz=imgsz, **export_kwargs)
+
+    model = YOLO(str(exported), task=task)
+    if intra_op_threads:
+        model.add_callback("on_predict_start", partial(_tune_threads, backend, exported, intra_op_threads))
+    return model
+
+
+def _tune_threads(backend: str, exported: Path, threads: int, predictor):
+    """
+    Rebuilds the runtime session with a fixed intra-op thread count. ultralytics
+    creates the session lazily with runtime defaults (all cores), which
+    oversubscribes the CPU when several models or workers run side by side.
+    """
+    runtime = predictor.model.backend
+    if getattr(runtime, "_intra_op_threads", None) == threads:
+        return
+
+    if backend == "onnx":
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        runtime.session = onnxruntime.InferenceSession(
+            str(exported), options, providers=runtime.session.get_providers()
+        )
+    elif backend == "openvino":
+        if runtime.read_model is not None:
+            # ultralytics recompiles this model per input shape itself, leave it alone
+            return
+        import openvino
+
+        core = openvino.Core()
+        keywords = runtime.compile_model.keywords
+        config = {**keywords.get("config", {}), "INFERENCE_NUM_THREADS": threads}
+        runtime.compile_model = partial(core.compile_model, device_name=keywords["device_name"], config=config)
+        runtime.ov_compiled_model = runtime.compile_model(core.read_model(str(next(exported.glob("*.xml")))))
+
+    runtime._intra_op_threads = threads
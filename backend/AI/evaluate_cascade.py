@@ -0,0 +1,132 @@
+"""
+Latency saved vs. accuracy lost by the cascade early exit (CASCADE_SKIP_CONF).
+
+Runs the full pipeline over a labelled validation set, first with every
+detection classified, then once per skip threshold, and reports per run the
+share of classifier calls skipped, the mean latency per image and the
+classification accuracy of the detected ground-truth items.
+
+Expected data layout (ultralytics detection format, class ids as in
+AI/dicts/detect_classes_v4.json):
+    <images>/*.jpg
+    <labels>/*.txt   one "class cx cy w h" line per item, normalized to 0-1
+
+Usage (from the backend directory):
+    python -m AI.evaluate_cascade --images data/val/images --labels data/val/labels --thresholds 0.6 0.75 0.9
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import cv2
+
+from AI.FoodDetection import FoodDetectionModel
+from AI.quantize import CLASSIFICATION_DIR, DETECTION_MODEL
+
+DICTS_DIR = Path(__file__).parent / "dicts"
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def load_samples(images_dir: Path, labels_dir: Path) -> list:
+    """Returns (image, [(class_id, x1, y1, x2, y2), ...]) per labelled image, boxes in pixels."""
+    samples = []
+    for image_path in sorted(path for path in images_dir.iterdir() if path.suffix.lower() in IMAGE_SUFFIXES):
+        label_path = labels_dir / f"{image_path.stem}.txt"
+        if not label_path.exists():
+            continue
+        image = cv2.imread(str(image_path))
+        height, width = image.shape[:2]
+        boxes = []
+        for line in label_path.read_text().splitlines():
+            if not line.strip():
+                continue
+            class_id, cx, cy, w, h = line.split()[:5]
+            cx, cy, w, h = float(cx) * width, float(cy) * height, float(w) * width, float(h) * height
+            boxes.append((int(class_id), cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2))
+        samples.append((image, boxes))
+    return samples
+
+
+def iou(a, b) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    intersection = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def evaluate(model: FoodDetectionModel, samples: list, conf_threshold: float, det_imgsz: int,
+             iou_threshold: float = 0.5) -> dict:
+    """Mean latency, accuracy of the matched ground-truth items and classifier skip rate of one run."""
+    stats_before = model.get_cascade_stats()
+    seconds, matched, correct = 0.0, 0, 0
+    for image, boxes in samples:
+        started_at = time.perf_counter()
+        outputs = model.run(image, conf_threshold=conf_threshold, det_imgsz=det_imgsz, verbose=False)
+        seconds += time.perf_counter() - started_at
+
+        for class_id, *gt_box in boxes:
+            best = max(outputs, key=lambda output: iou(output["bbox"], gt_box), default=None)
+            if best is None or iou(best["bbox"], gt_box) < iou_threshold:
+                continue
+            matched += 1
+            correct += best["pred_class_name"] == model.detection_id_to_name[str(class_id)]
+
+    stats_after = model.get_cascade_stats()
+    classified = sum(stats_after[g]["classified"] - stats_before[g]["classified"] for g in stats_after)
+    skipped = sum(stats_after[g]["skipped"] - stats_before[g]["skipped"] for g in stats_after)
+    return {
+        "ms_per_image": seconds * 1000 / max(1, len(samples)),
+        "accuracy": correct / max(1, matched),
+        "matched": matched,
+        "skip_rate": skipped / max(1, classified + skipped),
+    }
+
+
+def print_report(report: dict):
+    baseline = report["baseline"]
+    print(f"\n{'threshold':<12}{'skip rate':>10}{'ms/image':>10}{'saved ms':>10}{'accuracy':>10}{'delta':>10}")
+    for name, result in report.items():
+        print(
+            f"{name:<12}{result['skip_rate']:>10.1%}{result['ms_per_image']:>10.1f}"
+            f"{baseline['ms_per_image'] - result['ms_per_image']:>10.1f}{result['accuracy']:>10.4f}"
+            f"{result['accuracy'] - baseline['accuracy']:>+10.4f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the cascade early exit of the food detection model")
+    parser.add_argument("--images", required=True, help="Directory with validation images")
+    parser.add_argument("--labels", required=True, help="Directory with YOLO label files")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.75, 0.9],
+                        help="det_conf_score thresholds to skip the classifier at")
+    parser.add_argument("--conf", type=float, default=0.3, help="Detection confidence threshold")
+    parser.add_argument("--det-imgsz", type=int, default=1824)
+    parser.add_argument("--report", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    model = FoodDetectionModel(
+        detection_model_path=str(DETECTION_MODEL),
+        classification_config={path.stem: str(path) for path in sorted(CLASSIFICATION_DIR.glob("*.pt"))},
+        detection_id_to_name=str(DICTS_DIR / "detect_classes_v4.json"),
+        det_to_cls_group=str(DICTS_DIR / "det_to_cls_groups.json"),
+    )
+    samples = load_samples(Path(args.images), Path(args.labels))
+    print(f"Evaluating on {len(samples)} images...")
+    model.warm_up((args.det_imgsz,))
+
+    report = {"baseline": evaluate(model, samples, args.conf, args.det_imgsz)}
+    for threshold in args.thresholds:
+        model.set_cascade_policy(skip_conf=threshold, skip_single_class=True)
+        report[f">= {threshold}"] = evaluate(model, samples, args.conf, args.det_imgsz)
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
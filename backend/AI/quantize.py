@@ -0,0 +1,116 @@
+"""
+Static INT8 post-training quantization of the detector and group classifiers.
+
+Quantized artifacts are written next to the originals with the names
+AI/backends.py expects, e.g. `meat_int8.onnx` or `meat_int8_openvino_model/`,
+so setting MODEL_QUANTIZED=true (with a matching MODEL_BACKEND) serves them.
+
+Calibration uses a small fraction of the training split; accuracy is then
+measured on the validation split for both the original and quantized model.
+
+Expected data layout:
+    --det-data   ultralytics detection dataset yaml
+    --cls-data   directory with one classification dataset per group:
+                 <cls-data>/<group>/{train,val}/<class>/*.jpg
+
+Usage (from the backend directory):
+    python -m AI.quantize --backend openvino --det-data data/detection.yaml --cls-data data/classification
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from ultralytics import YOLO
+
+from AI.backends import QUANTIZABLE_BACKENDS, exported_model_path
+
+MODELS_DIR = Path(__file__).parent / "models"
+DETECTION_MODEL = MODELS_DIR / "detection_models" / "detection.pt"
+CLASSIFICATION_DIR = MODELS_DIR / "classification_models" / "YOLO"
+
+
+def quantize(weights_path: Path, backend: str, data: str, fraction: float, imgsz: int | None) -> Path:
+    """Exports an INT8 artifact calibrated on `fraction` of the training split."""
+    kwargs = {"format": backend, "quantize": 8, "data": data, "fraction": fraction, "split": "train",
+              "dynamic": True, "verbose": False}
+    if imgsz is not None:
+        kwargs["imgsz"] = imgsz
+    exported = Path(YOLO(str(weights_path)).export(**kwargs))
+
+    target = exported_model_path(str(weights_path), backend, quantized=True)
+    if exported.resolve() != target.resolve():
+        exported.rename(target)
+    return target
+
+
+def evaluate(model_path: Path, task: str, data: str, imgsz: int | None) -> dict:
+    """Validation accuracy of a model on the validation split."""
+    kwargs = {"data": data, "split": "val", "verbose": False, "plots": False}
+    if imgsz is not None:
+        kwargs["imgsz"] = imgsz
+    metrics = YOLO(str(model_path), task=task).val(**kwargs)
+    if task == "classify":
+        return {"top1": float(metrics.top1), "top5": float(metrics.top5)}
+    return {"map50": float(metrics.box.map50), "map50_95": float(metrics.box.map)}
+
+
+def run(name: str, weights_path: Path, task: str, backend: str, data: str, fraction: float,
+        imgsz: int | None) -> dict:
+    print(f"Quantizing '{name}' ({weights_path})...")
+    quantized_path = quantize(weights_path, backend, data, fraction, imgsz)
+
+    original = evaluate(weights_path, task, data, imgsz)
+    quantized = evaluate(quantized_path, task, data, imgsz)
+    return {
+        "model": str(quantized_path),
+        "original": original,
+        "quantized": quantized,
+        "delta": {metric: quantized[metric] - original[metric] for metric in original},
+    }
+
+
+def print_report(report: dict):
+    print(f"\n{'model':<22}{'metric':<10}{'original':>10}{'int8':>10}{'delta':>10}")
+    for name, result in report.items():
+        for metric, delta in result["delta"].items():
+            print(
+                f"{name:<22}{metric:<10}{result['original'][metric]:>10.4f}"
+                f"{result['quantized'][metric]:>10.4f}{delta:>+10.4f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 post-training quantization of the food detection models")
+    parser.add_argument("--backend", choices=QUANTIZABLE_BACKENDS, default="openvino")
+    parser.add_argument("--det-data", help="Detection dataset yaml, detector is skipped when omitted")
+    parser.add_argument("--cls-data", help="Directory with per-group classification datasets")
+    parser.add_argument("--groups", nargs="*", help="Only quantize these groups (default: all found)")
+    parser.add_argument("--fraction", type=float, default=0.1, help="Fraction of the training split to calibrate on")
+    parser.add_argument("--det-imgsz", type=int, default=None, help="Detector calibration/validation image size")
+    parser.add_argument("--report", help="Write the accuracy report as JSON to this path")
+    args = parser.parse_args()
+
+    report = {}
+    if args.det_data:
+        report["detection"] = run("detection", DETECTION_MODEL, "detect", args.backend, args.det_data,
+                                  args.fraction, args.det_imgsz)
+
+    if args.cls_data:
+        groups = args.groups or sorted(path.stem for path in CLASSIFICATION_DIR.glob("*.pt"))
+        for group in groups:
+            data = Path(args.cls_data) / group
+            if not data.is_dir():
+                print(f"No calibration data for group '{group}' at '{data}', skipping.")
+                continue
+            report[group] = run(group, CLASSIFICATION_DIR / f"{group}.pt", "classify", args.backend, str(data),
+                                args.fraction, None)
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,9 +10,109 @@ port = os.getenv("POSTGRES_PORT", "5432")
 
 DATABASE_URL = f"postgresql+psycopg://{user}:{password}@{host}:{port}/{db}"
 
+# Model product catalog, re-checked against the database every N seconds
+PRODUCT_CATALOG_REFRESH_SECONDS = float(os.getenv("PRODUCT_CATALOG_REFRESH_SECONDS", "60"))
+
 # Firebase
 FIREBASE_KEY_PATH = Path("/app/app/cal-cones-firebase-adminsdk-fbsvc-c2ea5e8376.json")
 
+# ID tokens are verified locally against Google's cached signing keys, claims cached until they expire.
+# Revocation (disabled or signed-out users) is checked with Firebase every AUTH_REVOCATION_CHECK_SECONDS
+# per user (0 = every request), in the background when enabled. AUTH_LOCAL_TOKEN_VERIFICATION=false
+# falls back to a Firebase round trip on every request
+AUTH_LOCAL_TOKEN_VERIFICATION = os.getenv("AUTH_LOCAL_TOKEN_VERIFICATION", "true").lower() == "true"
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_REVOCATION_CHECK_SECONDS = float(os.getenv("AUTH_REVOCATION_CHECK_SECONDS", "300"))
+AUTH_REVOCATION_CHECK_BACKGROUND = os.getenv("AUTH_REVOCATION_CHECK_BACKGROUND", "true").lower() == "true"
+
+# Authenticated uid -> user id cache (0 entries = disabled)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))  # seconds
+
 # Model
+MODEL_VERSION = os.getenv("MODEL_VERSION", "v4")
 CONF_THRESHOLD = 0.3
 DET_IMGSZ = 1824
+
+# Adaptive detection resolution: a cheap pass at the lowest tier, escalating crowded,
+# small-item or uncertain plates to the highest tier the image resolution justifies
+DET_ADAPTIVE_RESOLUTION = os.getenv("DET_ADAPTIVE_RESOLUTION", "true").lower() == "true"
+DET_IMGSZ_LADDER = tuple(int(tier) for tier in os.getenv("DET_IMGSZ_LADDER", f"640,1024,{DET_IMGSZ}").split(","))
+DET_ESCALATE_MAX_BOXES = int(os.getenv("DET_ESCALATE_MAX_BOXES", "8"))
+DET_ESCALATE_SMALL_BOX_AREA = float(os.getenv("DET_ESCALATE_SMALL_BOX_AREA", "0.01"))  # of the image area
+DET_ESCALATE_SMALL_FRACTION = float(os.getenv("DET_ESCALATE_SMALL_FRACTION", "0.3"))
+DET_ESCALATE_LOW_CONF = float(os.getenv("DET_ESCALATE_LOW_CONF", "0.5"))
+DET_ESCALATE_LOW_CONF_FRACTION = float(os.getenv("DET_ESCALATE_LOW_CONF_FRACTION", "0.5"))
+
+# Detection mode: "full" detects whole images (at DET_IMGSZ or the adaptive ladder), "tiled" cuts
+# large images into overlapping DET_TILE_SIZE tiles merged with NMS, for small items on huge photos
+DET_MODE = os.getenv("DET_MODE", "full")
+DET_TILE_SIZE = int(os.getenv("DET_TILE_SIZE", "640"))
+DET_TILE_OVERLAP = float(os.getenv("DET_TILE_OVERLAP", "0.2"))
+DET_TILE_NMS_IOU = float(os.getenv("DET_TILE_NMS_IOU", "0.5"))
+DET_TILE_BATCH = int(os.getenv("DET_TILE_BATCH", "32"))  # tiles per detector call
+
+# JPEGs are decoded at 1/2, 1/4 or 1/8 resolution when that still covers the largest detection size
+# (not in tiled mode). Items whose crop side is under CLS_MIN_CROP_SIDE pixels are cropped from a
+# full-resolution decode instead, made only when such an item exists
+DET_REDUCED_DECODE = os.getenv("DET_REDUCED_DECODE", "true").lower() == "true"
+CLS_MIN_CROP_SIDE = int(os.getenv("CLS_MIN_CROP_SIDE", "64"))
+
+CLS_GROUP_WORKERS = int(os.getenv("CLS_GROUP_WORKERS", "1"))  # group classifiers run concurrently when > 1
+
+# Inference backend for every model ("torch", "onnx" or "openvino"), overridable per model,
+# e.g. MODEL_BACKEND_OVERRIDES="detection=openvino,fruit=onnx"
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch")
+MODEL_BACKEND_OVERRIDES = dict(
+    item.split("=", 1) for item in os.getenv("MODEL_BACKEND_OVERRIDES", "").split(",") if "=" in item
+)
+MODEL_INTRA_OP_THREADS = int(os.getenv("MODEL_INTRA_OP_THREADS", "0")) or None  # runtime default when unset
+MODEL_QUANTIZED = os.getenv("MODEL_QUANTIZED", "false").lower() == "true"  # INT8 artifacts from AI/quantize.py
+
+# Cascade early exit: a detection keeps the detector's class and skips its group classifier when
+# det_conf_score reaches the group's threshold (e.g. CASCADE_SKIP_CONF_OVERRIDES="meat=0.9,fruit=0.8",
+# CASCADE_SKIP_CONF for the other groups, 0 = never) or when its group has a single class
+CASCADE_SKIP_CONF = float(os.getenv("CASCADE_SKIP_CONF", "0")) or None
+CASCADE_SKIP_CONF_OVERRIDES = {
+    group: float(threshold)
+    for group, threshold in (
+        item.split("=", 1) for item in os.getenv("CASCADE_SKIP_CONF_OVERRIDES", "").split(",") if "=" in item
+    )
+}
+CASCADE_SKIP_SINGLE_CLASS = os.getenv("CASCADE_SKIP_SINGLE_CLASS", "true").lower() == "true"
+
+# Group classifiers are loaded on first use when lazy, LRU-evicted above the budget (0 = no budget)
+CLS_LAZY_LOAD = os.getenv("CLS_LAZY_LOAD", "false").lower() == "true"
+CLS_MEMORY_BUDGET_MB = float(os.getenv("CLS_MEMORY_BUDGET_MB", "0")) or None
+CLS_PINNED_GROUPS = tuple(group for group in os.getenv("CLS_PINNED_GROUPS", "").split(",") if group)
+
+# Upload limits for /ai/detect, checked before the image is decoded
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(50_000_000)))
+MAX_IMAGE_SIDE = int(os.getenv("MAX_IMAGE_SIDE", "12000"))
+
+# Per-request limits for /ai/detect/batch (each image is also checked against the limits above)
+DET_BATCH_MAX_IMAGES = int(os.getenv("DET_BATCH_MAX_IMAGES", "16"))
+DET_BATCH_MAX_TOTAL_BYTES = int(os.getenv("DET_BATCH_MAX_TOTAL_BYTES", str(64 * 1024 * 1024)))
+
+# Detection result cache (keyed by image content + model settings)
+DETECTION_CACHE_MAX_BYTES = int(os.getenv("DETECTION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+DETECTION_CACHE_TTL = int(os.getenv("DETECTION_CACHE_TTL", "3600"))  # seconds
+DETECTION_CACHE_DIR = os.getenv("DETECTION_CACHE_DIR", "")  # shared on-disk tier, disabled when empty
+
+# Time budget of /ai/detect and /ai/detect/batch requests (0 = none); clients can shorten it with an
+# X-Request-Deadline-Ms header. Items whose classifier would finish late keep the detector's class
+# and are reported as degraded, images whose deadline passed before detection fail with 503
+AI_DETECT_DEADLINE_MS = int(os.getenv("AI_DETECT_DEADLINE_MS", "0"))
+
+# Adds a Server-Timing header with per-stage durations to /ai/detect responses (debugging only)
+AI_SERVER_TIMING = os.getenv("AI_SERVER_TIMING", "false").lower() == "true"
+
+# Inference executor
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "8"))
+INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", "2"))  # seconds
+
+# Cross-request micro-batching of /ai/detect
+DET_BATCH_MAX_SIZE = int(os.getenv("DET_BATCH_MAX_SIZE", "8"))
+DET_BATCH_WINDOW_MS = float(os.getenv("DET_BATCH_WINDOW_MS", "10"))
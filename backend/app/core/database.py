@@ -1,14 +1,22 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import DATABASE_URL
 
 
+# Sync engine, for migrations and scripts
 engine = create_engine(DATABASE_URL, echo=False)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API (psycopg's async mode, selected by create_async_engine).
+# Objects stay loaded after commit, an expired attribute can't be lazy-loaded outside of an await
+async_engine = create_async_engine(DATABASE_URL, echo=False)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 class Base(DeclarativeBase):
     pass
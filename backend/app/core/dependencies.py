@@ -1,21 +1,48 @@
+from dataclasses import dataclass
+
 import firebase_admin
 from firebase_admin import auth
 from fastapi import HTTPException, status, Header, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logger_setup import get_logger
-from app.core.database import SessionLocal
+from app.core.database import AsyncSessionLocal
+from app.core.token_verifier import FirebaseTokenVerifier, PublicKeyCache
+from app.core.user_cache import user_id_cache
+from app.models.user import User
+from app.config import (
+    AUTH_LOCAL_TOKEN_VERIFICATION,
+    AUTH_TOKEN_CACHE_SIZE,
+    AUTH_REVOCATION_CHECK_SECONDS,
+    AUTH_REVOCATION_CHECK_BACKGROUND,
+)
 
 logger = get_logger(__name__)
 
 
-def get_db():
+async def get_db():
     """"""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+_token_verifier = None
+
+
+def get_token_verifier() -> FirebaseTokenVerifier:
+    """Local ID token verifier of the initialized Firebase app, created on first use"""
+    global _token_verifier
+    if _token_verifier is None:
+        _token_verifier = FirebaseTokenVerifier(
+            project_id=firebase_admin.get_app().project_id,
+            keys=PublicKeyCache(),
+            revocation_interval=AUTH_REVOCATION_CHECK_SECONDS,
+            background_revocation=AUTH_REVOCATION_CHECK_BACKGROUND,
+            clock_skew_seconds=60,
+            max_tokens=AUTH_TOKEN_CACHE_SIZE,
+        )
+    return _token_verifier
 
 
 def verify_firebase_token(token: str):
@@ -28,14 +55,17 @@ def verify_firebase_token(token: str):
                 detail="Firebase not initialized",
             )
 
-        decoded_token = auth.verify_id_token(
-            token, check_revoked=True, clock_skew_seconds=60
-        )
+        if AUTH_LOCAL_TOKEN_VERIFICATION:
+            decoded_token = get_token_verifier().verify(token)
+        else:
+            decoded_token = auth.verify_id_token(
+                token, check_revoked=True, clock_skew_seconds=60
+            )
 
         logger.debug(f"Token verified successfully. UID: {decoded_token.get('uid')}")
         return decoded_token
 
-    except auth.InvalidIdTokenError as e:
+    except (auth.InvalidIdTokenError, auth.UserDisabledError) as e:
         logger.error(f"Invalid firebase token: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token: {str(e)}"
@@ -63,3 +93,23 @@ def get_current_user_uid(token: str = Depends(extract_token_from_header)) -> str
     """Gets current user uid from firebase token"""
     decoded_token = verify_firebase_token(token)
     return decoded_token.get("uid")
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    uid: str
+
+
+async def get_current_user(
+    uid: str = Depends(get_current_user_uid), db: AsyncSession = Depends(get_db)
+) -> CurrentUser:
+    """Resolves the authenticated user's database id, once per request and cached across requests"""
+    user_id = user_id_cache.get(uid)
+    if user_id is None:
+        user_id = await db.scalar(select(User.id).where(User.uid == uid))
+        if user_id is None:
+            logger.warning(f"User with uid {uid} does not exist")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        user_id_cache.set(uid, user_id)
+    return CurrentUser(id=user_id, uid=uid)
@@ -0,0 +1,223 @@
+import json
+import re
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+from cryptography.x509 import load_pem_x509_certificate
+from firebase_admin import auth
+
+from app.core.logger_setup import get_logger
+from app.core.metrics import registry
+
+logger = get_logger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+FIREBASE_ISSUER = "https://securetoken.google.com/"
+
+
+def fetch_google_certs(url: str = GOOGLE_CERTS_URL, timeout: float = 5) -> tuple[dict, float]:
+    """Downloads the signing certificates of Firebase ID tokens.
+    Returns ({kid: PEM certificate}, seconds they may be cached per Cache-Control)."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        certs = json.loads(response.read())
+        match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+    return certs, float(match.group(1)) if match else 0.0
+
+
+class PublicKeyCache:
+    """
+    Public keys of the Firebase token signers by key id, refetched once the
+    Cache-Control max-age of the last fetch expired. `fetch()` returns
+    ({kid: PEM certificate}, max-age seconds); tests pass a local key set.
+    """
+
+    def __init__(self, fetch=fetch_google_certs, min_refetch_seconds: float = 60):
+        self.fetch = fetch
+        self.min_refetch_seconds = min_refetch_seconds
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+        self._fetches = registry.counter("auth_public_key_fetches_total", "Fetches of the token signing keys")
+
+    def _refresh(self):
+        certs, max_age = self.fetch()
+        self._keys = {kid: load_pem_x509_certificate(pem.encode()).public_key() for kid, pem in certs.items()}
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + max_age
+        self._fetches.inc()
+
+    def get(self, kid: str):
+        """The public key for `kid`, or None if the signer does not know it.
+        An unknown kid triggers a refetch (keys rotate), at most every `min_refetch_seconds`."""
+        with self._lock:
+            now = time.monotonic()
+            recently_fetched = self._fetched_at is not None and now - self._fetched_at < self.min_refetch_seconds
+            if now >= self._expires_at or (kid not in self._keys and not recently_fetched):
+                try:
+                    self._refresh()
+                except Exception as e:
+                    if not self._keys:
+                        raise auth.CertificateFetchError(f"Could not fetch token signing keys: {e}", e)
+                    logger.warning(f"Token signing keys refresh failed, keeping the cached keys: {e}")
+            return self._keys.get(kid)
+
+
+class FirebaseTokenVerifier:
+    """
+    Verifies Firebase ID tokens locally, with the same checks as
+    `auth.verify_id_token`: RS256 signature by a current Google key, audience,
+    issuer, subject and expiry with `clock_skew_seconds` of leeway.
+
+    Decoded claims are cached per token until it expires. Revocation (the
+    user was disabled or signed out everywhere) needs a Firebase call, so its
+    result is cached per uid for `revocation_interval` seconds (0 = check on
+    every request). With `background_revocation`, a stale result keeps being
+    used while it is refreshed off the request path; only a uid never
+    checked before is checked inline.
+    """
+
+    def __init__(self, project_id: str, keys: PublicKeyCache, get_user=auth.get_user,
+                 revocation_interval: float = 300, background_revocation: bool = True,
+                 clock_skew_seconds: int = 60, max_tokens: int = 10000):
+        self.project_id = project_id
+        self.keys = keys
+        self.get_user = get_user
+        self.revocation_interval = revocation_interval
+        self.background_revocation = background_revocation
+        self.clock_skew_seconds = clock_skew_seconds
+        self.max_tokens = max_tokens
+
+        self._tokens = OrderedDict()  # token -> claims, least recently used first
+        self._revocations = {}  # uid -> (checked_at, tokens_valid_after_ms, disabled)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="token-revocation")
+
+        self._hits = registry.counter("auth_token_cache_hits_total", "ID tokens answered from the claims cache")
+        self._misses = registry.counter("auth_token_cache_misses_total", "ID tokens verified from scratch")
+        self._hit_rate = registry.gauge("auth_token_cache_hit_rate", "Share of ID tokens answered from the cache")
+        self._revocation_checks = registry.counter(
+            "auth_revocation_checks_total", "Firebase user lookups made to check token revocation"
+        )
+
+    def verify(self, token: str) -> dict:
+        """Returns the decoded claims of a valid, unrevoked token, with the user id under "uid".
+        Raises the `firebase_admin.auth` errors `auth.verify_id_token(check_revoked=True)` raises."""
+        claims = self._cached_claims(token)
+        if claims is None:
+            claims = self._decode(token)
+            with self._lock:
+                self._tokens[token] = claims
+                while len(self._tokens) > self.max_tokens:
+                    self._tokens.popitem(last=False)
+        self._check_revoked(claims)
+        return claims
+
+    def _cached_claims(self, token: str) -> dict | None:
+        with self._lock:
+            claims = self._tokens.get(token)
+            if claims is not None and time.time() - self.clock_skew_seconds >= claims["exp"]:
+                del self._tokens[token]
+                claims = None
+            if claims is not None:
+                self._tokens.move_to_end(token)
+        (self._hits if claims is not None else self._misses).inc()
+        hits, misses = self._hits.value, self._misses.value
+        self._hit_rate.set(hits / (hits + misses))
+        return claims
+
+    def _decode(self, token: str) -> dict:
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as e:
+            raise auth.InvalidIdTokenError(f"Malformed ID token: {e}", cause=e)
+        if header.get("alg") != "RS256":
+            raise auth.InvalidIdTokenError(f'ID token has incorrect algorithm "{header.get("alg")}", expected RS256')
+        key = self.keys.get(header.get("kid"))
+        if key is None:
+            raise auth.InvalidIdTokenError("ID token has an unknown \"kid\" claim")
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=FIREBASE_ISSUER + self.project_id,
+                leeway=self.clock_skew_seconds,
+                options={"require": ["exp", "iat", "sub"]},
+            )
+        except jwt.ExpiredSignatureError as e:
+            raise auth.ExpiredIdTokenError("ID token has expired", e)
+        except jwt.InvalidTokenError as e:
+            raise auth.InvalidIdTokenError(f"Invalid ID token: {e}", cause=e)
+
+        subject = claims["sub"]
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise auth.InvalidIdTokenError('ID token has an invalid "sub" (subject) claim')
+        if claims.get("auth_time", 0) > time.time() + self.clock_skew_seconds:
+            raise auth.InvalidIdTokenError('ID token has an "auth_time" in the future')
+        claims["uid"] = subject
+        return claims
+
+    def _check_revoked(self, claims: dict):
+        uid = claims["uid"]
+        with self._lock:
+            state = self._revocations.get(uid)
+        stale = state is None or time.monotonic() - state[0] >= self.revocation_interval
+        if stale and (state is None or not self.background_revocation):
+            state = self._lookup_user(uid)
+        elif stale:
+            self._refresh_in_background(uid)
+
+        _, tokens_valid_after_ms, disabled = state
+        if disabled:
+            raise auth.UserDisabledError("The user record is disabled.")
+        if claims["iat"] * 1000 < tokens_valid_after_ms:
+            raise auth.RevokedIdTokenError("The Firebase ID token has been revoked.")
+
+    def _lookup_user(self, uid: str) -> tuple:
+        user = self.get_user(uid)
+        self._revocation_checks.inc()
+        state = (time.monotonic(), user.tokens_valid_after_timestamp or 0, user.disabled)
+        with self._lock:
+            self._revocations[uid] = state
+        return state
+
+    def _refresh_in_background(self, uid: str):
+        with self._lock:
+            if uid in self._refreshing:
+                return
+            self._refreshing.add(uid)
+
+        def refresh():
+            try:
+                self._lookup_user(uid)
+            except auth.UserNotFoundError:
+                with self._lock:  # deleted: the next request checks inline and fails
+                    self._revocations.pop(uid, None)
+            except Exception as e:
+                logger.warning(f"Background revocation check for {uid} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(uid)
+
+        self._pool.submit(refresh)
+
+    def stats(self) -> dict:
+        hits, misses = self._hits.value, self._misses.value
+        with self._lock:
+            return {
+                "cached_tokens": len(self._tokens),
+                "cached_users": len(self._revocations),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "revocation_checks": self._revocation_checks.value,
+            }
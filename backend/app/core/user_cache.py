@@ -0,0 +1,55 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.metrics import registry
+from app.config import USER_CACHE_SIZE, USER_CACHE_TTL
+
+
+class UserIdCache:
+    """
+    Bounded firebase uid -> users.id cache with a TTL, so authenticated
+    requests don't look the user up again on every call. Entries are
+    dropped when the user is updated or deleted in this worker; the TTL
+    bounds how long other workers may keep a deleted user's id.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # uid -> (user id, expires at), least recently used first
+        self._lock = threading.Lock()
+
+        self._hits = registry.counter("user_cache_hits_total", "Authenticated user ids answered from the cache")
+        self._misses = registry.counter("user_cache_misses_total", "Authenticated user ids looked up in the database")
+
+    def get(self, uid: str) -> int | None:
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._entries[uid]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(uid)
+        (self._hits if entry is not None else self._misses).inc()
+        return entry[0] if entry is not None else None
+
+    def set(self, uid: str, user_id: int):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[uid] = (user_id, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(uid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, uid: str):
+        with self._lock:
+            self._entries.pop(uid, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_id_cache = UserIdCache(max_entries=USER_CACHE_SIZE, ttl_seconds=USER_CACHE_TTL)
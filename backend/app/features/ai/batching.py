@@ -0,0 +1,82 @@
+import asyncio
+
+from app.core.logger_setup import get_logger
+from app.core.metrics import registry
+from .executor import InferenceExecutor
+
+logger = get_logger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent requests and runs them through
+    `batch_fn(items, key)` together. A batch is flushed when it reaches
+    `max_batch_size` or `window_ms` after its first item arrived, whichever
+    comes first. Items are only batched with others sharing the same key.
+
+    `batch_fn` runs on the inference executor and must return one result
+    per item, in order. A result that is an Exception is raised only for
+    the request that submitted that item.
+    """
+
+    def __init__(self, batch_fn, executor: InferenceExecutor, max_batch_size: int, window_ms: float,
+                 name: str = "batch"):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = window_ms / 1000
+        self._pending = {}
+        self._timers = {}
+        self._tasks = set()
+
+        self._batch_size = registry.histogram(
+            f"{name}_batch_size", "Items per executed batch", buckets=(1, 2, 4, 8, 16, 32, 64)
+        )
+
+    async def submit(self, item, key=None):
+        """Adds an item to the current batch for `key` and awaits its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        batch = self._pending.setdefault(key, [])
+        batch.append((item, future))
+
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run_batch(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, key, batch: list):
+        self._batch_size.observe(len(batch))
+        items = [item for item, _ in batch]
+        try:
+            results = await self.executor.run(self.batch_fn, items, key)
+        except Exception as e:
+            logger.error(f"Batch of {len(items)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.logger_setup import get_logger
+from app.core.metrics import registry
+
+logger = get_logger(__name__)
+
+
+class DetectionResultCache:
+    """
+    LRU + TTL cache of raw model outputs keyed by image content.
+
+    Entries are kept as serialized JSON, so the memory budget is exact and
+    callers always get their own copy. When `disk_dir` is set, entries are
+    also written there so workers on the same node can share results.
+    """
+
+    DISK_PRUNE_EVERY = 100  # writes between sweeps of expired files
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, disk_dir: str | None = None,
+                 name: str = "detection_cache"):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.disk_dir = disk_dir or None
+        self._entries = OrderedDict()  # key -> (expires_at, payload)
+        self._size = 0
+        self._disk_writes = 0
+        self._lock = threading.Lock()
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        self._hits = registry.counter(f"{name}_hits_total", "Lookups answered from memory")
+        self._disk_hits = registry.counter(f"{name}_disk_hits_total", "Lookups answered from the disk tier")
+        self._misses = registry.counter(f"{name}_misses_total", "Lookups that required inference")
+        self._evictions = registry.counter(f"{name}_evictions_total", "Entries evicted to stay within budget")
+        self._bytes = registry.gauge(f"{name}_bytes", "Bytes held by the in-memory tier")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or self.disk_dir is not None
+
+    @staticmethod
+    def make_key(content: bytes, *params) -> str:
+        """Hashes the image bytes together with everything that changes the model output"""
+        digest = hashlib.blake2b(content, digest_size=16)
+        digest.update(repr(params).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits.inc()
+                    return json.loads(payload)
+                self._remove(key)
+
+        payload = self._read_disk(key, now)
+        if payload is not None:
+            self._disk_hits.inc()
+            self._store(key, payload, now)
+            return json.loads(payload)
+
+        self._misses.inc()
+        return None
+
+    def set(self, key: str, value):
+        payload = json.dumps(value)
+        now = time.time()
+        self._store(key, payload, now)
+        self._write_disk(key, payload, now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._bytes.set(0)
+
+    def _store(self, key: str, payload: str, now: float):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (now + self.ttl, payload)
+            self._size += size
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions.inc()
+            self._bytes.set(self._size)
+
+    def _remove(self, key: str):
+        _, payload = self._entries.pop(key)
+        self._size -= len(payload)
+        self._bytes.set(self._size)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str, now: float) -> str | None:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl <= now:
+                os.remove(path)
+                return None
+            with open(path, "r") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Failed to read cached detection {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, payload: str, now: float):
+        if not self.disk_dir:
+            return
+        try:
+            # Write to a temp file first so concurrent readers never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            logger.warning(f"Failed to write cached detection {key}: {e}")
+            return
+
+        self._disk_writes += 1
+        if self._disk_writes % self.DISK_PRUNE_EVERY == 0:
+            self._prune_disk(now)
+
+    def _prune_disk(self, now: float):
+        for entry in os.scandir(self.disk_dir):
+            try:
+                if entry.name.endswith(".json") and entry.stat().st_mtime + self.ttl <= now:
+                    os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,18 @@
+class InferenceQueueFullException(Exception):
+    pass
+
+
+class ImageTooLargeException(Exception):
+    pass
+
+
+class BatchTooLargeException(Exception):
+    pass
+
+
+class ModelNotReadyException(Exception):
+    pass
+
+
+class DeadlineExceededException(Exception):
+    pass
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE
+from app.core.logger_setup import get_logger
+from app.core.metrics import registry
+from .exceptions import InferenceQueueFullException
+
+logger = get_logger(__name__)
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model inference on a dedicated thread pool so it never
+    blocks the event loop. At most `max_workers` jobs run at once and at most
+    `max_queue_size` more may wait; anything beyond that is rejected.
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int, name: str = "inference"):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue_size)
+
+        self._queue_depth = registry.gauge(f"{name}_queue_depth", "Jobs waiting for an inference worker")
+        self._in_flight = registry.gauge(f"{name}_in_flight", "Jobs currently running on an inference worker")
+        self._rejected = registry.counter(f"{name}_rejected_total", "Jobs rejected because the queue was full")
+        self._wait_time = registry.histogram(f"{name}_wait_seconds", "Time a job spent waiting in the queue")
+        self._run_time = registry.histogram(f"{name}_run_seconds", "Time a job spent running on a worker")
+
+    async def run(self, fn, *args, **kwargs):
+        """Schedules `fn(*args, **kwargs)` on the pool and awaits its result"""
+        if not self._slots.acquire(blocking=False):
+            self._rejected.inc()
+            logger.warning("Inference queue is full, rejecting job")
+            raise InferenceQueueFullException("Inference queue is full")
+
+        self._queue_depth.inc()
+        queued_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            self._queue_depth.dec()
+            self._in_flight.inc()
+            self._wait_time.observe(started_at - queued_at)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._run_time.observe(time.perf_counter() - started_at)
+                self._in_flight.dec()
+                self._slots.release()
+
+        try:
+            future = self._pool.submit(job)
+        except Exception:
+            self._queue_depth.dec()
+            self._slots.release()
+            raise
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+
+inference_executor = InferenceExecutor(max_workers=INFERENCE_WORKERS, max_queue_size=INFERENCE_QUEUE_SIZE)
@@ -0,0 +1,67 @@
+"""
+Resident and shared memory of the API processes, to check that workers share
+the model weights (see gunicorn.conf.py).
+
+Usage (from the backend directory), for a gunicorn master and its workers:
+    python -m app.features.ai.memory <master pid>
+"""
+
+import os
+import sys
+
+# smaps_rollup fields (in kB) summed into each reported value
+_FIELDS = {
+    "rss": ("Rss",),
+    "pss": ("Pss",),
+    "shared": ("Shared_Clean", "Shared_Dirty"),
+    "private": ("Private_Clean", "Private_Dirty"),
+}
+
+
+def process_memory(pid: int | str = "self") -> dict:
+    """Memory of one process in bytes. `pss` splits shared pages between the processes using them,
+    so summing it over the workers gives their real footprint."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {name: sum(values.get(field, 0) for field in fields) for name, fields in _FIELDS.items()}
+
+
+def child_pids(pid: int) -> list[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def memory_report(master_pid: int) -> dict:
+    workers = {}
+    for pid in child_pids(master_pid):
+        try:
+            workers[pid] = process_memory(pid)
+        except (FileNotFoundError, ProcessLookupError):
+            continue  # exited meanwhile
+    return {
+        "master": {master_pid: process_memory(master_pid)},
+        "workers": workers,
+        "total_pss": process_memory(master_pid)["pss"] + sum(worker["pss"] for worker in workers.values()),
+    }
+
+
+def print_report(report: dict):
+    mib = 1024 * 1024
+    print(f"{'process':<10}{'pid':>8}{'rss MiB':>10}{'shared MiB':>12}{'private MiB':>13}{'pss MiB':>10}")
+    for role in ("master", "workers"):
+        for pid, memory in report[role].items():
+            print(
+                f"{role.rstrip('s'):<10}{pid:>8}{memory['rss'] / mib:>10.1f}{memory['shared'] / mib:>12.1f}"
+                f"{memory['private'] / mib:>13.1f}{memory['pss'] / mib:>10.1f}"
+            )
+    print(f"total pss: {report['total_pss'] / mib:.1f} MiB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python -m app.features.ai.memory <master pid>")
+    print_report(memory_report(int(sys.argv[1])))
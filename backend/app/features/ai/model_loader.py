@@ -1,4 +1,31 @@
+import gc
+import threading
+import time
+
 from AI.FoodDetection import FoodDetectionModel
+from app.core.logger_setup import get_logger
+from app.core.metrics import registry
+from app.config import (
+    CASCADE_SKIP_CONF,
+    CASCADE_SKIP_CONF_OVERRIDES,
+    CASCADE_SKIP_SINGLE_CLASS,
+    DET_ADAPTIVE_RESOLUTION,
+    DET_IMGSZ,
+    DET_IMGSZ_LADDER,
+    DET_MODE,
+    DET_TILE_SIZE,
+    CLS_GROUP_WORKERS,
+    CLS_LAZY_LOAD,
+    CLS_MEMORY_BUDGET_MB,
+    CLS_PINNED_GROUPS,
+    MODEL_BACKEND,
+    MODEL_BACKEND_OVERRIDES,
+    MODEL_INTRA_OP_THREADS,
+    MODEL_QUANTIZED,
+)
+from .exceptions import ModelNotReadyException
+
+logger = get_logger(__name__)
 
 
 YOLO_PATH = "/app/AI/models/classification_models/YOLO/"
@@ -14,9 +41,128 @@ clsModelsDict = {
 }
 
 
-model = FoodDetectionModel(
-    detection_model_path="/app/AI/models/detection_models/detection.pt",
-    classification_config=clsModelsDict,
-    detection_id_to_name="/app/AI/dicts/detect_classes_v4.json",
-    det_to_cls_group="/app/AI/dicts/det_to_cls_groups.json",
+def build_model() -> FoodDetectionModel:
+    return FoodDetectionModel(
+        detection_model_path="/app/AI/models/detection_models/detection.pt",
+        classification_config=clsModelsDict,
+        detection_id_to_name="/app/AI/dicts/detect_classes_v4.json",
+        det_to_cls_group="/app/AI/dicts/det_to_cls_groups.json",
+        classification_workers=CLS_GROUP_WORKERS,
+        lazy_classification=CLS_LAZY_LOAD,
+        classification_memory_budget_mb=CLS_MEMORY_BUDGET_MB,
+        pinned_groups=CLS_PINNED_GROUPS,
+        backend=MODEL_BACKEND,
+        backend_overrides=MODEL_BACKEND_OVERRIDES,
+        intra_op_threads=MODEL_INTRA_OP_THREADS,
+        quantized=MODEL_QUANTIZED,
+        cascade_skip_conf=CASCADE_SKIP_CONF,
+        cascade_skip_conf_overrides=CASCADE_SKIP_CONF_OVERRIDES,
+        cascade_skip_single_class=CASCADE_SKIP_SINGLE_CLASS,
+    )
+
+
+class ModelLoader:
+    """
+    Builds the model in a background thread and warms it up with dummy inferences,
+    so importing the app doesn't block and only warm workers report ready.
+
+    Under gunicorn (see gunicorn.conf.py) the master calls `preload` before forking,
+    and each worker only warms up the shared model.
+
+    status: "pending" -> "loading" -> ["preloaded" ->] "warming_up" -> "ready", or "failed"
+    """
+
+    def __init__(self, build, model_names: list, warm_up_sizes: tuple = ()):
+        self._build = build
+        self.model_names = model_names
+        self.warm_up_sizes = warm_up_sizes
+        self.status = "pending"
+        self.error = None
+        self._model = None  # set once built, served once ready
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._load_seconds = registry.gauge("model_load_seconds", "Time to load and warm up the models")
+
+    def start(self):
+        """Starts loading (or only warming up a preloaded model) in the background, once per process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            target = self.warm_up if self.status == "preloaded" else self.load
+            self._thread = threading.Thread(target=target, name="model-loader", daemon=True)
+            self._thread.start()
+
+    def load(self):
+        started_at = time.perf_counter()
+        self.status = "loading"
+        try:
+            self._model = self._build()
+        except Exception as e:
+            logger.error(f"Failed to load models: {e}")
+            self.error = str(e)
+            self.status = "failed"
+            return
+        self.warm_up()
+        self._load_seconds.set(time.perf_counter() - started_at)
+
+    def preload(self):
+        """
+        Builds the model in a process that is about to fork workers. The weights go to
+        shared memory and the heap is frozen so the garbage collector doesn't dirty
+        shared pages, so every worker maps one copy of the weights.
+
+        No inference runs here: starting the runtime's thread pools before forking can
+        deadlock the workers. Each worker warms up after the fork via `start`.
+        """
+        started_at = time.perf_counter()
+        self.status = "loading"
+        self._model = self._build()
+        self._model.share_memory()
+        gc.freeze()
+        self.status = "preloaded"
+        logger.info(f"Models preloaded for sharing in {time.perf_counter() - started_at:.1f}s")
+
+    def warm_up(self):
+        started_at = time.perf_counter()
+        self.status = "warming_up"
+        try:
+            self._model.warm_up(self.warm_up_sizes)
+        except Exception as e:
+            # The models work, the first requests will just be slower
+            logger.warning(f"Model warm-up failed: {e}")
+
+        self.status = "ready"
+        logger.info(f"Models ready, warm-up took {time.perf_counter() - started_at:.1f}s")
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def get(self) -> FoodDetectionModel:
+        if not self.ready:
+            raise ModelNotReadyException(f"Models are not ready ({self.status})")
+        return self._model
+
+    def report(self) -> dict:
+        """Overall status and the load state of every model"""
+        if self._model is not None:
+            models = self._model.get_states()
+        else:
+            state = "failed" if self.status == "failed" else "loading" if self.status == "loading" else "not_loaded"
+            models = {name: state for name in self.model_names}
+        return {"status": self.status, "ready": self.ready, "error": self.error, "models": models}
+
+
+model_loader = ModelLoader(
+    build_model,
+    model_names=["detection", *clsModelsDict],
+    warm_up_sizes=(
+        (DET_TILE_SIZE,) if DET_MODE == "tiled" else DET_IMGSZ_LADDER if DET_ADAPTIVE_RESOLUTION else (DET_IMGSZ,)
+    ),
 )
+
+
+def get_model() -> FoodDetectionModel:
+    """The loaded model, raises ModelNotReadyException while it is still loading"""
+    return model_loader.get()
@@ -0,0 +1,76 @@
+from app.core.logger_setup import get_logger
+from app.core.metrics import registry
+
+logger = get_logger(__name__)
+
+
+class ResolutionPolicy:
+    """
+    Picks the detection image size per image from a ladder of tiers.
+
+    Every image first gets a cheap pass at the lowest tier. Only when that
+    pass finds a crowded plate, many small boxes or many low-confidence
+    boxes is the image detected again at the highest tier its own resolution
+    justifies (images are never upscaled past the first tier covering their
+    long side). Otherwise the first pass result is used as is.
+    """
+
+    def __init__(self, ladder: tuple, max_boxes: int, small_box_area: float, small_box_fraction: float,
+                 low_conf: float, low_conf_fraction: float):
+        self.ladder = tuple(sorted(ladder))
+        self.max_boxes = max_boxes
+        self.small_box_area = small_box_area
+        self.small_box_fraction = small_box_fraction
+        self.low_conf = low_conf
+        self.low_conf_fraction = low_conf_fraction
+
+        self._tiers = {tier: registry.counter(f"detection_tier_{tier}_total", f"Images detected at {tier}px")
+                       for tier in self.ladder}
+        self._escalations = registry.counter("detection_escalations_total", "Images re-detected at a higher tier")
+
+    @property
+    def signature(self) -> tuple:
+        """Everything that changes the policy's decisions, for cache keys"""
+        return (self.ladder, self.max_boxes, self.small_box_area, self.small_box_fraction, self.low_conf,
+                self.low_conf_fraction)
+
+    def max_tier(self, image_shape) -> int:
+        """Smallest tier covering the image's long side, or the top tier for larger images"""
+        long_side = max(image_shape[:2])
+        return next((tier for tier in self.ladder if tier >= long_side), self.ladder[-1])
+
+    def needs_escalation(self, detections: list, image_shape) -> bool:
+        if not detections:
+            return False
+        if len(detections) >= self.max_boxes:
+            return True
+
+        image_area = image_shape[0] * image_shape[1]
+        small = sum(1 for d in detections if (d[2] - d[0]) * (d[3] - d[1]) / image_area < self.small_box_area)
+        low_conf = sum(1 for d in detections if d[6] < self.low_conf)
+        return (small / len(detections) >= self.small_box_fraction
+                or low_conf / len(detections) >= self.low_conf_fraction)
+
+    def detect(self, model, images: list, conf_threshold: float, timings=None) -> tuple[list, list]:
+        """Detects all images, escalating where needed. Returns detections and the tier used per image."""
+        first_tier = self.ladder[0]
+        detections_per_image = model.detect(images, conf_threshold, first_tier, verbose=False, timings=timings)
+        tiers = [first_tier] * len(images)
+
+        escalate = {}
+        for i, (image, detections) in enumerate(zip(images, detections_per_image)):
+            target = self.max_tier(image.shape)
+            if target > first_tier and self.needs_escalation(detections, image.shape):
+                escalate.setdefault(target, []).append(i)
+
+        for tier, indices in escalate.items():
+            logger.debug(f"Escalating {len(indices)} image(s) to {tier}px detection")
+            self._escalations.inc(len(indices))
+            results = model.detect([images[i] for i in indices], conf_threshold, tier, verbose=False, timings=timings)
+            for i, detections in zip(indices, results):
+                detections_per_image[i] = detections
+                tiers[i] = tier
+
+        for tier in tiers:
+            self._tiers[tier].inc()
+        return detections_per_image, tiers
@@ -1,13 +1,41 @@
+import asyncio
+import json
+import os
+import time
 from typing import List
-from fastapi import APIRouter, status, HTTPException, UploadFile, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, status, HTTPException, UploadFile, Depends, Response, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.features.ai.schemas import AIResponse
 from app.core.dependencies import get_db
 
-from .model_loader import model
-from .service import prepare_file_for_model, cleanup_temp_file, process_model_output
-from app.config import CONF_THRESHOLD, DET_IMGSZ
+from .service import (
+    prepare_file_for_model,
+    process_model_output,
+    run_detection,
+    run_detection_batch,
+    stream_detection,
+    degraded_count,
+)
+from .model_loader import get_model
+from .exceptions import (
+    InferenceQueueFullException,
+    ImageTooLargeException,
+    BatchTooLargeException,
+    ModelNotReadyException,
+    DeadlineExceededException,
+)
+from .timing import StageTimings
+from .memory import process_memory
+from app.config import (
+    INFERENCE_RETRY_AFTER,
+    DET_BATCH_MAX_IMAGES,
+    DET_BATCH_MAX_TOTAL_BYTES,
+    AI_SERVER_TIMING,
+    AI_DETECT_DEADLINE_MS,
+)
 
 from app.core.logger_setup import get_logger
 
@@ -16,22 +44,207 @@ logger = get_logger(__name__)
 router = APIRouter(prefix="/ai", tags=["ai"])
 
 
+def _request_deadline(budget_ms: int | None) -> float | None:
+    """time.monotonic() deadline from the X-Request-Deadline-Ms header, capped by AI_DETECT_DEADLINE_MS"""
+    if budget_ms is None or budget_ms <= 0:
+        budget_ms = AI_DETECT_DEADLINE_MS
+    elif AI_DETECT_DEADLINE_MS:
+        budget_ms = min(budget_ms, AI_DETECT_DEADLINE_MS)
+    return time.monotonic() + budget_ms / 1000 if budget_ms else None
+
+
 @router.post("/detect", status_code=status.HTTP_200_OK)
-async def detect_products(image: UploadFile, db=Depends(get_db)):
-    tmp_path = None
+async def detect_products(image: UploadFile, response: Response, db=Depends(get_db),
+                          x_request_deadline_ms: int | None = Header(None)):
+    deadline = _request_deadline(x_request_deadline_ms)
+    timings = StageTimings()
     try:
-        tmp_path = await prepare_file_for_model(image)
+        content = await prepare_file_for_model(image, timings)
 
-        results = model.run(tmp_path, conf_threshold=CONF_THRESHOLD, det_imgsz=DET_IMGSZ, verbose=False)
-        results = process_model_output(results, db)
+        detection = await run_detection(content, timings, deadline)
+        response.headers["X-Detection-Imgsz"] = str(detection["det_imgsz"])
+        # Items that kept the detector's class because classifying them would miss the deadline
+        response.headers["X-Detection-Degraded"] = str(degraded_count(detection["outputs"]))
+        results = await process_model_output(detection["outputs"], db, timings)
+        if AI_SERVER_TIMING:
+            response.headers["Server-Timing"] = timings.server_timing()
         return results
 
+    except InferenceQueueFullException as e:
+        logger.warning(f"Detection rejected: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Inference queue is full, try again later",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+        )
+    except ModelNotReadyException as e:
+        logger.warning(f"Detection rejected: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Models are still loading, try again later",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+        )
+    except DeadlineExceededException as e:
+        logger.warning(f"Detection rejected: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Request deadline passed before detection, try again later",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+        )
+    except ImageTooLargeException as e:
+        logger.warning(f"Detection rejected: {e}")
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
     except ValueError as ve:
         logger.error(f"ValueError during detection: {ve}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
     except Exception as e:
         logger.error(f"Unexpected error during detection: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
-    finally:
-        if tmp_path:
-            cleanup_temp_file(tmp_path)
+
+
+@router.post("/detect/stream", status_code=status.HTTP_200_OK)
+async def detect_products_stream(image: UploadFile, db=Depends(get_db)):
+    """
+    Streaming variant of /detect as NDJSON: the boxes right after detection, then each
+    item's top 3 products as its group classifier finishes, then the final results.
+    """
+    try:
+        content = await prepare_file_for_model(image)
+
+        # Wait for the first event, so request errors still get a proper status code
+        events = stream_detection(content, db)
+        first_event = await anext(events)
+
+    except InferenceQueueFullException as e:
+        logger.warning(f"Detection rejected: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Inference queue is full, try again later",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+        )
+    except ModelNotReadyException as e:
+        logger.warning(f"Detection rejected: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Models are still loading, try again later",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+        )
+    except ImageTooLargeException as e:
+        logger.warning(f"Detection rejected: {e}")
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as ve:
+        logger.error(f"ValueError during detection: {ve}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Unexpected error during detection: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+    async def ndjson():
+        yield json.dumps(jsonable_encoder(first_event)) + "\n"
+        try:
+            async for event in events:
+                yield json.dumps(jsonable_encoder(event)) + "\n"
+        except Exception as e:
+            logger.error(f"Unexpected error during streamed detection: {e}")
+            yield json.dumps({"event": "error", "detail": "Internal server error"}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def _image_error(filename: str, e: Exception) -> dict:
+    """Result entry for one image of a batch that could not be processed"""
+    if isinstance(e, DeadlineExceededException):
+        logger.warning(f"Batch image '{filename}' rejected: {e}")
+        return {"filename": filename, "status_code": status.HTTP_503_SERVICE_UNAVAILABLE, "detail": str(e)}
+    if isinstance(e, ImageTooLargeException):
+        logger.warning(f"Batch image '{filename}' rejected: {e}")
+        return {"filename": filename, "status_code": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "detail": str(e)}
+    if isinstance(e, ValueError):
+        logger.error(f"ValueError during detection of batch image '{filename}': {e}")
+        return {"filename": filename, "status_code": status.HTTP_400_BAD_REQUEST, "detail": str(e)}
+    logger.error(f"Unexpected error during detection of batch image '{filename}': {e}")
+    return {"filename": filename, "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR, "detail": "Internal server error"}
+
+
+@router.post("/detect/batch", status_code=status.HTTP_200_OK)
+async def detect_products_batch(images: List[UploadFile], response: Response, db=Depends(get_db),
+                                x_request_deadline_ms: int | None = Header(None)):
+    """
+    Detects products on several images at once. Returns one entry per image, in upload order,
+    with either its results (as returned by /detect) or the error that image failed with.
+    """
+    deadline = _request_deadline(x_request_deadline_ms)
+    timings = StageTimings()
+    try:
+        if len(images) > DET_BATCH_MAX_IMAGES:
+            raise BatchTooLargeException(f"At most {DET_BATCH_MAX_IMAGES} images per batch.")
+
+        contents = await asyncio.gather(
+            *(prepare_file_for_model(image, timings) for image in images), return_exceptions=True
+        )
+        if sum(len(content) for content in contents if isinstance(content, bytes)) > DET_BATCH_MAX_TOTAL_BYTES:
+            raise BatchTooLargeException(f"Uploaded images exceed {DET_BATCH_MAX_TOTAL_BYTES} bytes in total.")
+
+        valid = [i for i, content in enumerate(contents) if isinstance(content, bytes)]
+        detections = await run_detection_batch([contents[i] for i in valid], timings, deadline)
+        for i, detection in zip(valid, detections):
+            contents[i] = detection
+
+        results = []
+        for image, detection in zip(images, contents):
+            if isinstance(detection, Exception):
+                results.append(_image_error(image.filename, detection))
+                continue
+            results.append({
+                "filename": image.filename,
+                "det_imgsz": detection["det_imgsz"],
+                "degraded": degraded_count(detection["outputs"]),
+                "results": await process_model_output(detection["outputs"], db, timings),
+            })
+        if AI_SERVER_TIMING:
+            response.headers["Server-Timing"] = timings.server_timing()
+        return results
+
+    except InferenceQueueFullException as e:
+        logger.warning(f"Batch detection rejected: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Inference queue is full, try again later",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+        )
+    except ModelNotReadyException as e:
+        logger.warning(f"Batch detection rejected: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Models are still loading, try again later",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+        )
+    except BatchTooLargeException as e:
+        logger.warning(f"Batch detection rejected: {e}")
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error during batch detection: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.get("/models/usage", status_code=status.HTTP_200_OK)
+async def get_models_usage():
+    """Per-group classifier usage and load state"""
+    try:
+        return get_model().cls_manager.get_usage_stats()
+    except ModelNotReadyException as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+@router.get("/models/cascade", status_code=status.HTTP_200_OK)
+async def get_models_cascade():
+    """Per-group share of detections that skipped their classifier"""
+    try:
+        return get_model().get_cascade_stats()
+    except ModelNotReadyException as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+@router.get("/models/memory", status_code=status.HTTP_200_OK)
+async def get_models_memory():
+    """Resident, shared and private memory of the worker answering the request"""
+    return {"pid": os.getpid(), **process_memory()}
@@ -1,59 +1,394 @@
-import tempfile
-import os
+import asyncio
+import time
+from functools import cache
+from typing import Callable, NamedTuple
+import numpy as np
 from fastapi import UploadFile
-from pathlib import Path
 from io import BytesIO
 from PIL import Image
-from sqlalchemy.orm import Session
-from app.features.product.service import get_product_from_model
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.features.product.catalog import model_product_catalog
 from app.core.logger_setup import get_logger
+from app.core.metrics import registry
 from app.features.product.schemas import ProductResponse
+from app.config import (
+    CONF_THRESHOLD,
+    DET_IMGSZ,
+    DET_BATCH_MAX_SIZE,
+    DET_BATCH_WINDOW_MS,
+    MAX_UPLOAD_BYTES,
+    MAX_IMAGE_PIXELS,
+    MAX_IMAGE_SIDE,
+    MODEL_VERSION,
+    DETECTION_CACHE_MAX_BYTES,
+    DETECTION_CACHE_TTL,
+    DETECTION_CACHE_DIR,
+    DET_ADAPTIVE_RESOLUTION,
+    DET_IMGSZ_LADDER,
+    DET_ESCALATE_MAX_BOXES,
+    DET_ESCALATE_SMALL_BOX_AREA,
+    DET_ESCALATE_SMALL_FRACTION,
+    DET_ESCALATE_LOW_CONF,
+    DET_ESCALATE_LOW_CONF_FRACTION,
+    DET_MODE,
+    DET_TILE_SIZE,
+    DET_TILE_OVERLAP,
+    DET_TILE_NMS_IOU,
+    DET_TILE_BATCH,
+    DET_REDUCED_DECODE,
+    CLS_MIN_CROP_SIDE,
+    CASCADE_SKIP_CONF,
+    CASCADE_SKIP_CONF_OVERRIDES,
+    CASCADE_SKIP_SINGLE_CLASS,
+)
+from AI.FoodDetection import FoodDetectionModel
+from .model_loader import get_model
+from .executor import inference_executor
+from .batching import MicroBatcher
+from .cache import DetectionResultCache
+from .resolution import ResolutionPolicy
+from .exceptions import ImageTooLargeException, DeadlineExceededException
+from .timing import StageTimings
 
 logger = get_logger(__name__)
 
+degraded_items = registry.counter(
+    "ai_degraded_items_total", "Items answered with the detector's class to meet their request deadline"
+)
+deadline_exceeded = registry.counter(
+    "ai_deadline_exceeded_total", "Images failed because their request deadline passed before detection"
+)
 
-async def prepare_file_for_model(image: UploadFile) -> str:
-    content = await image.read()
+resolution_policy = (
+    ResolutionPolicy(
+        ladder=DET_IMGSZ_LADDER,
+        max_boxes=DET_ESCALATE_MAX_BOXES,
+        small_box_area=DET_ESCALATE_SMALL_BOX_AREA,
+        small_box_fraction=DET_ESCALATE_SMALL_FRACTION,
+        low_conf=DET_ESCALATE_LOW_CONF,
+        low_conf_fraction=DET_ESCALATE_LOW_CONF_FRACTION,
+    )
+    if DET_ADAPTIVE_RESOLUTION and DET_MODE != "tiled"
+    else None
+)
 
-    try:
-        with Image.open(BytesIO(content)) as img:
-            img.verify()
-    except Exception as e:
-        raise ValueError("Uploaded file is not a valid image.") from e
+# Smallest long side a reduced decode may have: the largest size the detector will be run at
+reduced_decode_side = (
+    (max(DET_IMGSZ_LADDER) if resolution_policy is not None else DET_IMGSZ)
+    if DET_REDUCED_DECODE and DET_MODE != "tiled"
+    else None
+)
 
-    suffix = image.filename and Path(image.filename).suffix or "jpg"
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
 
-    try:
-        tmp.write(content)
-        tmp.flush()
-        tmp_path = tmp.name
-    finally:
-        tmp.close()
+class DecodedImage(NamedTuple):
+    pixels: np.ndarray
+    scale: int  # factor from `pixels` back to the original resolution
+    load_full: Callable | None  # lazy, cached full-resolution decode when scale > 1
+
+
+def _decode(image) -> DecodedImage:
+    """Decodes an uploaded image, at reduced resolution when that still covers the detection size"""
+    if reduced_decode_side is None:
+        return DecodedImage(FoodDetectionModel.load_image(image), 1, None)
+    pixels, scale = FoodDetectionModel.load_image_reduced(image, reduced_decode_side)
+    load_full = cache(lambda: FoodDetectionModel.load_image(image)) if scale > 1 else None
+    return DecodedImage(pixels, scale, load_full)
+
+
+def _scale_bbox(bbox: list, scale: int) -> list:
+    return [value * scale for value in bbox] if scale != 1 else bbox
+
+
+def _classify(model, decoded: list[DecodedImage], detections: list, on_group_done=None, timings=None,
+              deadlines=None) -> list:
+    """Classifies the detections of decoded images, returning outputs with boxes in original-resolution pixels"""
+    full_resolution = [(d.scale, d.load_full) if d.scale > 1 else None for d in decoded]
+    outputs = model.classify([d.pixels for d in decoded], detections, on_group_done=on_group_done,
+                             timings=timings, full_resolution=full_resolution, min_crop_side=CLS_MIN_CROP_SIDE,
+                             deadlines=deadlines)
+    for output, d in zip(outputs, decoded):
+        for item in output:
+            item["bbox"] = _scale_bbox(item["bbox"], d.scale)
+    return outputs
+
+
+def degraded_count(outputs: list[dict]) -> int:
+    """Items of one image's outputs that kept the detector's class to meet the deadline"""
+    return sum(1 for item in outputs if item.get("degraded"))
+
+
+def _expired(deadline: float | None) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def _detect(model, images: list, conf_threshold: float, det_imgsz: int, timings: StageTimings) -> tuple[list, list]:
+    """Detects decoded images in the configured mode. Returns detections and the image size used per image."""
+    if DET_MODE == "tiled":
+        detections = model.detect_tiled(images, conf_threshold, tile_size=DET_TILE_SIZE, overlap=DET_TILE_OVERLAP,
+                                        nms_iou=DET_TILE_NMS_IOU, max_batch=DET_TILE_BATCH, verbose=False,
+                                        timings=timings)
+        return detections, [DET_TILE_SIZE] * len(images)
+    if resolution_policy is not None:
+        return resolution_policy.detect(model, images, conf_threshold, timings=timings)
+    detections = model.detect(images, conf_threshold, det_imgsz, verbose=False, timings=timings)
+    return detections, [det_imgsz] * len(images)
+
+
+def _run_detection_batch(image_buffers: list, key: tuple, deadlines: list | None = None) -> list[dict | Exception]:
+    """
+    Runs one batched model pass over encoded (or already decoded) images;
+    images that fail to decode or whose deadline (time.monotonic(), None = none)
+    passed before detection only fail their own request.
+    Each result holds the model outputs, the detection image size that was used
+    and the stage timings of the batch.
+    """
+    conf_threshold, det_imgsz = key
+    deadlines = deadlines or [None] * len(image_buffers)
+    model = get_model()
+    timings = StageTimings()
+    results = [None] * len(image_buffers)
+    images, indices = [], []
+    with timings.stage("decode"):
+        for i, buffer in enumerate(image_buffers):
+            if _expired(deadlines[i]):
+                deadline_exceeded.inc()
+                results[i] = DeadlineExceededException("Request deadline passed before detection.")
+                continue
+            try:
+                images.append(buffer if isinstance(buffer, DecodedImage) else _decode(buffer))
+                indices.append(i)
+            except ValueError as e:
+                results[i] = e
+
+    if images:
+        detections, tiers = _detect(model, [image.pixels for image in images], conf_threshold, det_imgsz, timings)
+
+        outputs = _classify(model, images, detections, timings=timings, deadlines=[deadlines[i] for i in indices])
+        for i, output, tier in zip(indices, outputs, tiers):
+            degraded_items.inc(degraded_count(output))
+            results[i] = {"outputs": output, "det_imgsz": tier, "timings": timings.stages}
+    return results
+
+
+def _run_submitted_batch(items: list[tuple], key: tuple) -> list[dict | Exception]:
+    """Batch function of the micro-batcher, whose items are (image, deadline) pairs"""
+    images, deadlines = zip(*items)
+    return _run_detection_batch(list(images), key, list(deadlines))
+
+
+detection_batcher = MicroBatcher(
+    _run_submitted_batch,
+    inference_executor,
+    max_batch_size=DET_BATCH_MAX_SIZE,
+    window_ms=DET_BATCH_WINDOW_MS,
+    name="detection",
+)
+
+
+detection_cache = DetectionResultCache(
+    max_bytes=DETECTION_CACHE_MAX_BYTES,
+    ttl_seconds=DETECTION_CACHE_TTL,
+    disk_dir=DETECTION_CACHE_DIR,
+)
+
 
-    return tmp_path
+def _cache_lookup(image: bytes) -> tuple[str, dict | None]:
+    policy = resolution_policy.signature if resolution_policy is not None else None
+    if DET_MODE == "tiled":
+        policy = (DET_MODE, DET_TILE_SIZE, DET_TILE_OVERLAP, DET_TILE_NMS_IOU)
+    cascade = (CASCADE_SKIP_CONF, sorted(CASCADE_SKIP_CONF_OVERRIDES.items()), CASCADE_SKIP_SINGLE_CLASS)
+    decode = (reduced_decode_side, CLS_MIN_CROP_SIDE)
+    key = detection_cache.make_key(image, CONF_THRESHOLD, DET_IMGSZ, MODEL_VERSION, policy, cascade, decode)
+    return key, detection_cache.get(key)
 
 
-def cleanup_temp_file(file_path: str):
+async def run_detection(image: bytes, timings: StageTimings | None = None, deadline: float | None = None) -> dict:
+    """
+    Runs the detection pipeline, batched together with concurrent requests.
+    Images seen before are answered from the result cache.
+    With a `deadline` (time.monotonic()), items that cannot be classified in time keep
+    the detector's class and are marked "degraded"; such results are not cached.
+    Returns {"outputs": model outputs, "det_imgsz": detection image size used}.
+    """
+    timings = timings if timings is not None else StageTimings()
+    cache_key = None
+    if detection_cache.enabled:
+        with timings.stage("cache"):
+            cache_key, cached = await asyncio.to_thread(_cache_lookup, image)
+        if cached is not None:
+            return cached
+
+    get_model()  # fail fast while the models are still loading
+    if _expired(deadline):
+        deadline_exceeded.inc()
+        raise DeadlineExceededException("Request deadline passed before detection.")
+    results = await detection_batcher.submit((image, deadline), key=(CONF_THRESHOLD, DET_IMGSZ))
+    timings.merge(results.pop("timings"))
+    if cache_key is not None and not degraded_count(results["outputs"]):
+        await asyncio.to_thread(detection_cache.set, cache_key, results)
+    return results
+
+
+async def run_detection_batch(images: list[bytes], timings: StageTimings | None = None,
+                              deadline: float | None = None) -> list[dict | Exception]:
+    """
+    Runs the detection pipeline over the images of one request: they are decoded
+    concurrently, then detected in one batch and classified with one pass per group
+    across all crops. Returns one result per image in the shape of run_detection,
+    or the exception that image failed with. `deadline` works as in run_detection.
+    """
+    timings = timings if timings is not None else StageTimings()
+    results = [None] * len(images)
+    cache_keys = [None] * len(images)
+    if detection_cache.enabled:
+        with timings.stage("cache"):
+            lookups = await asyncio.gather(*(asyncio.to_thread(_cache_lookup, image) for image in images))
+        for i, (cache_key, cached) in enumerate(lookups):
+            cache_keys[i], results[i] = cache_key, cached
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    if pending:
+        get_model()  # fail fast while the models are still loading
+    with timings.stage("decode"):
+        decoded = await asyncio.gather(
+            *(asyncio.to_thread(_decode, images[i]) for i in pending), return_exceptions=True
+        )
+
+    to_run = []
+    for i, image in zip(pending, decoded):
+        if isinstance(image, Exception):
+            results[i] = image
+        else:
+            to_run.append((i, image))
+    if not to_run:
+        return results
+
+    outputs = await inference_executor.run(
+        _run_detection_batch, [image for _, image in to_run], (CONF_THRESHOLD, DET_IMGSZ), [deadline] * len(to_run)
+    )
+    batch_stages = {}
+    for (i, _), output in zip(to_run, outputs):
+        if not isinstance(output, Exception):
+            batch_stages = output.pop("timings")
+        results[i] = output
+    timings.merge(batch_stages)
+
+    to_cache = [i for i, _ in to_run if cache_keys[i] is not None and not isinstance(results[i], Exception)
+                and not degraded_count(results[i]["outputs"])]
+    await asyncio.gather(*(asyncio.to_thread(detection_cache.set, cache_keys[i], results[i]) for i in to_cache))
+    return results
+
+
+def _run_streaming_detection(image: bytes, emit) -> dict:
+    """Runs the pipeline for one image, emitting the boxes after detection and each
+    item's top 3 as its group classifier finishes. Returns the run_detection result."""
+    model = get_model()
+    timings = StageTimings()
+    with timings.stage("decode"):
+        decoded = _decode(image)
+    detections, tiers = _detect(model, [decoded.pixels], CONF_THRESHOLD, DET_IMGSZ, timings)
+    detections = detections[0]
+
+    emit({
+        "event": "detections",
+        "det_imgsz": tiers[0],
+        "items": [
+            {"index": index, "bbox": _scale_bbox([x1, y1, x2, y2], decoded.scale), "det_class_name": det_class_name,
+             "det_conf_score": det_conf_score, "cls_group": cls_group}
+            for index, (x1, y1, x2, y2, _, det_class_name, det_conf_score, cls_group) in enumerate(detections)
+        ],
+    })
+
+    def on_group_done(group: str, top5_by_detection: dict):
+        for (_, index), top5 in top5_by_detection.items():
+            emit({"event": "classified", "index": index, "cls_group": group, "top5_cls_results": top5[:3]})
+
+    outputs = _classify(model, [decoded], [detections], on_group_done=on_group_done, timings=timings)[0]
+    return {"outputs": outputs, "det_imgsz": tiers[0]}
+
+
+async def stream_detection(image: bytes, db: AsyncSession):
+    """
+    Async generator of detection events for one image:
+    - "detections": the boxes, right after the detector pass
+    - "classified": one item's top 3 products, as soon as its group classifier finished
+    - "result": the final merged results, as returned by /ai/detect
+    Cached images only produce the "result" event.
+    """
+    cache_key, cached = (None, None)
+    if detection_cache.enabled:
+        cache_key, cached = await asyncio.to_thread(_cache_lookup, image)
+    if cached is not None:
+        yield {"event": "result", "det_imgsz": cached["det_imgsz"],
+               "results": await process_model_output(cached["outputs"], db)}
+        return
+
+    get_model()  # fail fast while the models are still loading
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def emit(event: dict):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    task = asyncio.create_task(inference_executor.run(_run_streaming_detection, image, emit))
+    # Queued after every event the worker emitted, also when it fails before running
+    task.add_done_callback(lambda _: events.put_nowait(None))
+
+    while (event := await events.get()) is not None:
+        if event["event"] == "classified":
+            products = await process_model_output([event], db)
+            event = {"event": "classified", "index": event["index"], "cls_group": event["cls_group"],
+                     "products": products[0] if products is not None else None}
+        yield event
+
+    detection = await task
+    if cache_key is not None:
+        await asyncio.to_thread(detection_cache.set, cache_key, detection)
+    yield {"event": "result", "det_imgsz": detection["det_imgsz"],
+           "results": await process_model_output(detection["outputs"], db)}
+
+
+async def prepare_file_for_model(image: UploadFile, timings: StageTimings | None = None) -> bytes:
+    """
+    Reads the upload into memory and validates it without decoding pixel data.
+    Only the image header is parsed here, so oversized or decompression-bomb
+    images are rejected before the model decodes them.
+    """
+    timings = timings if timings is not None else StageTimings()
+    with timings.stage("read"):
+        content = await image.read(MAX_UPLOAD_BYTES + 1)
+    if len(content) > MAX_UPLOAD_BYTES:
+        raise ImageTooLargeException(f"Uploaded file exceeds {MAX_UPLOAD_BYTES} bytes.")
+
     try:
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
+        with timings.stage("verify"), Image.open(BytesIO(content)) as img:
+            width, height = img.size
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeException("Uploaded image has too many pixels.") from e
     except Exception as e:
-        raise RuntimeError(f"Failed to delete temporary file: {file_path}") from e
+        raise ValueError("Uploaded file is not a valid image.") from e
+
+    if max(width, height) > MAX_IMAGE_SIDE or width * height > MAX_IMAGE_PIXELS:
+        raise ImageTooLargeException(f"Uploaded image is too large ({width}x{height}).")
 
+    return content
 
-def process_model_output(output: list[dict], db: Session) -> list[list[dict]] | None:
+
+async def process_model_output(output: list[dict], db: AsyncSession,
+                               timings: StageTimings | None = None) -> list[list[dict]] | None:
+    timings = timings if timings is not None else StageTimings()
     try:
+        # Top 3 candidates per item, mapped to products in one catalog lookup
+        candidates = [item["top5_cls_results"][:3] for item in output]
+        with timings.stage("product_lookup"):
+            products = await model_product_catalog.get_many(db, {c["class_name"] for item in candidates for c in item})
+
         processed_results = []
-        for item in output:
+        for item in candidates:
             products_list = []
-            i = 0
-            for product in item["top5_cls_results"]:
-                if i >= 3:
-                    break
-                product_info = _get_product_info(db, product["class_name"])
+            for product in item:
+                product_info = _get_product_info(products, product["class_name"])
                 products_list.append({"product": product_info, "probability": product["probability"]})
-                i += 1
 
             processed_results.append(products_list)
 
@@ -62,5 +397,8 @@ def process_model_output(output: list[dict], db: Session) -> list[list[dict]] |
         logger.error(f"Error during process_model_output: {e}")
 
 
-def _get_product_info(db: Session, name: str) -> ProductResponse:
-    return get_product_from_model(db, name)
+def _get_product_info(products: dict, name: str) -> ProductResponse:
+    product = products[name]
+    if product is None:
+        raise ValueError(f"No product for model class '{name}'")
+    return product
@@ -0,0 +1,46 @@
+import time
+from contextlib import contextmanager
+
+from app.core.metrics import registry
+
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class StageTimings:
+    """
+    Durations and item counts of the detection pipeline stages.
+
+    Every recorded stage is observed in an `ai_stage_<stage>_seconds` histogram
+    and every count in an `ai_<name>` histogram. Stages of a model batch are
+    recorded once per batch, then merged into the timings of each request in
+    it (without observing them again) for the Server-Timing header.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counts = {}
+
+    def add(self, stage: str, seconds: float, count: tuple[str, int] | None = None):
+        """Records `seconds` spent in `stage`, and optionally a (name, value) count such as boxes found"""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        registry.histogram(f"ai_stage_{stage}_seconds", f"Time spent in the '{stage}' stage").observe(seconds)
+        if count is not None:
+            name, value = count
+            self.counts[name] = self.counts.get(name, 0) + value
+            registry.histogram(f"ai_{name}", f"'{name}' per model call", buckets=COUNT_BUCKETS).observe(value)
+
+    @contextmanager
+    def stage(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def merge(self, stages: dict):
+        """Adds stages already observed elsewhere (a shared batch) to these timings"""
+        for stage, seconds in stages.items():
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items())
@@ -1,17 +1,19 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
 
 from app.models.user import User
 from .schemas import UserCreate, UserResponse
 from .exceptions import UserAlreadyExistsException, UserDoesNotExistsException
 from app.core.logger_setup import get_logger
+from app.core.user_cache import user_id_cache
 
 logger = get_logger(__name__)
 
 
-def create_user_account(db: Session, user_credential: UserCreate) -> UserResponse:
+async def create_user_account(db: AsyncSession, user_credential: UserCreate) -> UserResponse:
     """Creates a new user account in a database"""
-    if _get_user_account_by_uid(db, user_credential.uid) or _get_user_account_by_email(
+    if await _get_user_account_by_uid(db, user_credential.uid) or await _get_user_account_by_email(
         db, user_credential.email
     ):
         raise UserAlreadyExistsException("User already exists")
@@ -24,38 +26,39 @@ def create_user_account(db: Session, user_credential: UserCreate) -> UserRespons
         setup_completed=False,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return UserResponse.model_validate(db_user)
 
 
-def delete_user_account(db: Session, uid: str) -> UserResponse:
+async def delete_user_account(db: AsyncSession, uid: str) -> UserResponse:
     """
     Deletes user account from a database
     based on a uid string
     """
-    db_user = _get_user_account_by_uid(db, uid)
+    db_user = await _get_user_account_by_uid(db, uid)
     if not db_user:
         logger.error(f"Error deleting user account: User with uid: {uid} does not exist.")
         raise UserDoesNotExistsException("User does not exist")
 
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    await db.commit()
+    user_id_cache.invalidate(uid)
     return UserResponse.model_validate(db_user)
 
 
-def get_user_account_by_uid(db: Session, uid: str) -> UserResponse:
-    db_user = db.query(User).filter(User.uid == uid).first()
+async def get_user_account_by_uid(db: AsyncSession, uid: str) -> UserResponse:
+    db_user = await _get_user_account_by_uid(db, uid)
     if not db_user:
         logger.error(f"User with uid: {uid} does not exist")
         raise UserDoesNotExistsException("User does not exist")
     return UserResponse.model_validate(db_user)
 
 
-def _get_user_account_by_uid(db: Session, uid: str) -> User | None:
-    db_user = db.query(User).filter(User.uid == uid).first()
+async def _get_user_account_by_uid(db: AsyncSession, uid: str) -> User | None:
+    db_user = await db.scalar(select(User).where(User.uid == uid))
     return db_user
 
 
-def _get_user_account_by_email(db: Session, email: str) -> User | None:
-    return db.query(User).filter(User.email == email).first()
+async def _get_user_account_by_email(db: AsyncSession, email: str) -> User | None:
+    return await db.scalar(select(User).where(User.email == email).limit(1))
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logger_setup import get_logger
-from app.core.dependencies import get_current_user_uid, get_db
+from app.core.dependencies import CurrentUser, get_current_user, get_db
 from app.features.meal.schemas import MealProductCreate, MealProductResponse, MealProductUpdate
 from app.features.meal.service import (
     create_new_meal_product,
@@ -19,13 +19,13 @@ router = APIRouter(prefix="/meal-product", tags=["meal"])
 
 
 @router.post("/create", response_model=MealProductResponse, status_code=status.HTTP_201_CREATED)
-def create_meal_product(
+async def create_meal_product(
     meal_product: MealProductCreate,
-    db: Session = Depends(get_db),
-    user_uid: str = Depends(get_current_user_uid),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     try:
-        new_meal_product = create_new_meal_product(db, meal_product, user_uid)
+        new_meal_product = await create_new_meal_product(db, meal_product, current_user.id)
         return new_meal_product
     except ValueError as e:
         logger.error(f"Error creating meal product: {e}")
@@ -33,13 +33,13 @@ def create_meal_product(
 
 
 @router.put("/update", response_model=MealProductResponse, status_code=status.HTTP_200_OK)
-def update_meal_product_endpoint(
+async def update_meal_product_endpoint(
     meal_product: MealProductUpdate,
-    db: Session = Depends(get_db),
-    user_uid: str = Depends(get_current_user_uid),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     try:
-        updated_meal_product = update_meal_product(db, meal_product, user_uid)
+        updated_meal_product = await update_meal_product(db, meal_product, current_user.id)
         return updated_meal_product
     except ValueError as e:
         logger.error(f"Error updating meal product: {e}")
@@ -47,25 +47,25 @@ def update_meal_product_endpoint(
 
 
 @router.delete("/delete/{meal_product_uuid}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_meal_product_endpoint(
+async def delete_meal_product_endpoint(
     meal_product_uuid: str,
-    db: Session = Depends(get_db),
-    user_uid: str = Depends(get_current_user_uid),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     try:
-        delete_meal_product(db, meal_product_uuid, user_uid)
+        await delete_meal_product(db, meal_product_uuid, current_user.id)
     except ValueError as e:
         logger.error(f"Error deleting meal product: {e}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.get("/all", response_model=list[MealProductResponse], status_code=status.HTTP_200_OK)
-def get_all_meal_products_endpoint(
-    db: Session = Depends(get_db),
-    user_uid: str = Depends(get_current_user_uid),
+async def get_all_meal_products_endpoint(
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     try:
-        meal_products = get_all_meal_products(db, user_uid)
+        meal_products = await get_all_meal_products(db, current_user.id)
         return meal_products
     except ValueError as e:
         logger.error(f"Error retrieving meal products: {e}")
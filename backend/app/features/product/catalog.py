@@ -0,0 +1,87 @@
+import asyncio
+from types import MappingProxyType
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product
+from app.features.product.schemas import ProductResponse
+from app.core.logger_setup import get_logger
+from app.core.metrics import registry
+
+logger = get_logger(__name__)
+
+
+class ModelProductCatalog:
+    """
+    In-process, read-only snapshot of the products the model can predict,
+    keyed by `name_from_model`.
+
+    The snapshot is replaced as a whole, never mutated, so lookups need no
+    locking; concurrent reloads at worst both load the same snapshot. It is
+    marked stale by product writes in this worker and by a periodic version
+    check that notices writes made by other workers.
+    """
+
+    def __init__(self):
+        self._products = MappingProxyType({})
+        self._version = None
+        self._stale = True
+
+        self._loads = registry.counter("product_catalog_loads_total", "Catalog (re)loads from the database")
+        self._size = registry.gauge("product_catalog_size", "Products held by the catalog")
+
+    @staticmethod
+    async def _query_version(db: AsyncSession) -> tuple:
+        """Cheap fingerprint of the model products, changes whenever one is added, edited or removed"""
+        result = await db.execute(
+            select(func.count(Product.uuid), func.max(Product.last_modified_at)).where(Product.from_model.is_(True))
+        )
+        count, last_modified = result.one()
+        return count, last_modified
+
+    async def load(self, db: AsyncSession):
+        self._stale = False
+        version = await self._query_version(db)
+        products = {}
+        for product in await db.scalars(
+            select(Product).where(Product.from_model.is_(True), Product.name_from_model.isnot(None))
+        ):
+            products.setdefault(product.name_from_model, ProductResponse.model_validate(product))
+
+        self._products = MappingProxyType(products)
+        self._version = version
+        self._loads.inc()
+        self._size.set(len(products))
+        logger.info(f"Loaded {len(products)} model products into the catalog")
+
+    def invalidate(self):
+        """Reload on the next lookup"""
+        self._stale = True
+
+    async def check_version(self, db: AsyncSession):
+        """Reloads if the model products changed since the last load"""
+        if self._stale or await self._query_version(db) != self._version:
+            await self.load(db)
+
+    async def get_many(self, db: AsyncSession, names) -> dict[str, ProductResponse | None]:
+        """Looks up several model class names at once, None for names without a product.
+        Only touches the database when the snapshot is stale."""
+        if self._stale:
+            await self.load(db)
+        products = self._products
+        return {name: products.get(name) for name in names}
+
+
+model_product_catalog = ModelProductCatalog()
+
+
+async def run_catalog_refresher(catalog: ModelProductCatalog, session_factory, interval: float):
+    """Loads the catalog, then keeps checking its version every `interval` seconds"""
+    while True:
+        try:
+            async with session_factory() as db:
+                await catalog.check_version(db)
+        except Exception as e:
+            logger.warning(f"Product catalog refresh failed: {e}")
+        await asyncio.sleep(interval)
@@ -1,9 +1,9 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.logger_setup import get_logger
-from app.core.dependencies import get_current_user_uid, get_db
+from app.core.dependencies import CurrentUser, get_current_user, get_db
 from app.features.product.schemas import ProductCreate, ProductResponse, ProductUpdate
 from app.features.product.service import (
     add_product,
@@ -21,12 +21,12 @@ router = APIRouter(prefix="/product", tags=["product"])
 @router.post("/create", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_user_product(
     product_data: ProductCreate,
-    db: Session = Depends(get_db),
-    current_user_uid: str = Depends(get_current_user_uid),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Add a new product for the current user"""
     try:
-        product_response = add_product(db, product_data, current_user_uid)
+        product_response = await add_product(db, product_data, current_user.id)
         return product_response
     except ValueError as e:
         logger.error(f"Add product failed: {e}")
@@ -39,12 +39,12 @@ async def create_user_product(
 @router.put("/update", response_model=ProductResponse, status_code=status.HTTP_200_OK)
 async def update_user_product(
     product_data: ProductUpdate,
-    db: Session = Depends(get_db),
-    current_user_uid: str = Depends(get_current_user_uid),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Update a product for the current user"""
     try:
-        product_response = update_product(db, product_data, current_user_uid)
+        product_response = await update_product(db, product_data, current_user.id)
         return product_response
     except ValueError as e:
         logger.error(f"Update product failed: {e}")
@@ -57,12 +57,12 @@ async def update_user_product(
 @router.delete("/delete/{uuid}", response_model=None, status_code=status.HTTP_200_OK)
 async def delete_user_product(
     uuid: str,
-    db: Session = Depends(get_db),
-    current_user_uid: str = Depends(get_current_user_uid),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Delete a product for the current user"""
     try:
-        delete_product(db, uuid, current_user_uid)
+        await delete_product(db, uuid, current_user.id)
         return
     except ValueError as e:
         logger.error(f"Delete product failed: {e}")
@@ -75,11 +75,11 @@ async def delete_user_product(
 @router.get("/search/{query}", response_model=list[ProductResponse], status_code=status.HTTP_200_OK)
 async def search_all_products(
     query: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Search products in the database"""
     try:
-        products = search_products(db, query or "")
+        products = await search_products(db, query or "")
         return products
     except Exception as e:
         logger.error(f"Search products failed: {e}")
@@ -88,12 +88,12 @@ async def search_all_products(
 
 @router.get("/added/", response_model=list[ProductResponse], status_code=status.HTTP_200_OK)
 async def get_all_user_products(
-    db: Session = Depends(get_db),
-    current_user_uid: str = Depends(get_current_user_uid),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Get all products for the current user"""
     try:
-        products = get_user_products(db, current_user_uid)
+        products = await get_user_products(db, current_user.id)
         return products
     except ValueError as e:
         logger.error(f"Get user products failed: {e}")
@@ -1,27 +1,24 @@
 from uuid import uuid4
 from datetime import datetime, timezone
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.product import Product
-from app.models.user import User
 from app.features.product.schemas import ProductCreate, ProductUpdate, ProductResponse
+from app.features.product.catalog import model_product_catalog
 from app.core.logger_setup import get_logger
 
 logger = get_logger(__name__)
 
 
-def add_product(db: Session, product_data: ProductCreate, user_uid: str) -> ProductResponse:
+async def add_product(db: AsyncSession, product_data: ProductCreate, user_id: int) -> ProductResponse:
     """Add a new custom product"""
-    user = db.query(User).filter(User.uid == user_uid).first()
-    if not user:
-        raise ValueError(f"User with uid {user_uid} not found")
-
     product_uuid = product_data.uuid if product_data.uuid else uuid4()
     now = datetime.now(tz=timezone.utc)
 
     new_product = Product(
         uuid=product_uuid,
-        user_id=user.id,
+        user_id=user_id,
         name=product_data.name,
         manufacturer=product_data.manufacturer,
         kcal=product_data.kcal,
@@ -36,64 +33,60 @@ def add_product(db: Session, product_data: ProductCreate, user_uid: str) -> Prod
     )
 
     db.add(new_product)
-    db.commit()
-    db.refresh(new_product)
+    await db.commit()
+    await db.refresh(new_product)
+    if new_product.from_model:
+        model_product_catalog.invalidate()
     return ProductResponse.model_validate(new_product)
 
 
-def update_product(db: Session, product_data: ProductUpdate, user_uid: str) -> ProductResponse:
+async def update_product(db: AsyncSession, product_data: ProductUpdate, user_id: int) -> ProductResponse:
     """Update an existing product"""
-    user = db.query(User).filter(User.uid == user_uid).first()
-    if not user:
-        raise ValueError(f"User with uid {user_uid} not found")
-
-    product = db.query(Product).filter(Product.uuid == product_data.uuid, Product.user_id == user.id).first()
+    product = await db.scalar(select(Product).where(Product.uuid == product_data.uuid, Product.user_id == user_id))
 
     if not product:
-        raise ValueError(f"Product with uuid {product_data.uuid} not found for user {user_uid}")
+        raise ValueError(f"Product with uuid {product_data.uuid} not found for user {user_id}")
 
+    was_from_model = product.from_model
     update_data = product_data.model_dump(exclude_unset=True, exclude={"uuid"})
     for field, value in update_data.items():
         setattr(product, field, value)
 
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await db.refresh(product)
+    if was_from_model or product.from_model:
+        model_product_catalog.invalidate()
     return ProductResponse.model_validate(product)
 
 
-def delete_product(db: Session, product_uuid: str, user_uid: str) -> None:
+async def delete_product(db: AsyncSession, product_uuid: str, user_id: int) -> None:
     """Delete a product by UUID"""
-    user = db.query(User).filter(User.uid == user_uid).first()
-    if not user:
-        raise ValueError(f"User with uid {user_uid} not found")
-
-    product = db.query(Product).filter(Product.uuid == product_uuid, Product.user_id == user.id).first()
+    product = await db.scalar(select(Product).where(Product.uuid == product_uuid, Product.user_id == user_id))
 
     if not product:
         logger.warning(f"Product {product_uuid} not found, may be already deleted")
         return
 
-    db.delete(product)
-    db.commit()
+    from_model = product.from_model
+    await db.delete(product)
+    await db.commit()
+    if from_model:
+        model_product_catalog.invalidate()
 
 
-def get_user_products(db: Session, user_uid: str) -> list[ProductResponse]:
+async def get_user_products(db: AsyncSession, user_id: int) -> list[ProductResponse]:
     """Get all products for a user"""
-    user = db.query(User).filter(User.uid == user_uid).first()
-    if not user:
-        raise ValueError(f"User with uid {user_uid} not found")
-
-    products = db.query(Product).filter(Product.user_id == user.id).all()
+    products = await db.scalars(select(Product).where(Product.user_id == user_id))
     return [ProductResponse.model_validate(product) for product in products]
 
 
-def search_products(db: Session, query: str) -> list[ProductResponse]:
+async def search_products(db: AsyncSession, query: str) -> list[ProductResponse]:
     """Search products in the database"""
     query = query.strip()
-    products = db.query(Product).filter(Product.name.ilike(f"%{query}%")).all()
+    products = await db.scalars(select(Product).where(Product.name.ilike(f"%{query}%")))
     return [ProductResponse.model_validate(product) for product in products]
 
 
-def get_product_from_model(db: Session, name_from_model: str) -> ProductResponse:
-    product = db.query(Product).filter(Product.name_from_model == name_from_model).first()
+async def get_product_from_model(db: AsyncSession, name_from_model: str) -> ProductResponse:
+    product = await db.scalar(select(Product).where(Product.name_from_model == name_from_model).limit(1))
     return ProductResponse.model_validate(product)
@@ -0,0 +1,2 @@
+class OnboardingAlreadyCompletedException(Exception):
+    pass
@@ -2,10 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.exceptions import RequestValidationError
 
 from app.core.logger_setup import get_logger
-from app.core.dependencies import get_current_user_uid, get_db
+from app.core.dependencies import CurrentUser, get_current_user, get_db
 from app.features.user.schemas import UserOnboardingCreate, UserProfileUpdate
 from app.features.user.service import complete_user_onboarding, update_user_data
-from app.features.auth.service import get_user_account_by_uid
+from app.features.user.exceptions import OnboardingAlreadyCompletedException
 
 
 logger = get_logger(__name__)
@@ -17,19 +17,16 @@ router = APIRouter(prefix="/user", tags=["user"])
 async def create_onboarding_data(
     onboarding_data: UserOnboardingCreate,
     db=Depends(get_db),
-    current_user_uid: str = Depends(get_current_user_uid),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Complete user onboarding - setup profile and create first goal"""
-    user = get_user_account_by_uid(db, current_user_uid)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    if user.id != onboarding_data.id:
+    if current_user.id != onboarding_data.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden action")
-    if user.setup_completed:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Onboarding already completed")
     try:
-        user_response, goal_response = complete_user_onboarding(db, onboarding_data)
+        user_response, goal_response = await complete_user_onboarding(db, onboarding_data)
         return {"user": user_response, "goal": goal_response}
+    except OnboardingAlreadyCompletedException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except ValueError as e:
         logger.error(f"Onboarding creation failed: {e}")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -42,15 +39,12 @@ async def create_onboarding_data(
 async def update_user_profile(
     update_data: UserProfileUpdate,
     db=Depends(get_db),
-    current_user_uid: str = Depends(get_current_user_uid),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    user = get_user_account_by_uid(db, current_user_uid)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    if user.id != update_data.id:
+    if current_user.id != update_data.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden action")
     try:
-        user_response = update_user_data(db, update_data)
+        user_response = await update_user_data(db, update_data)
         return user_response
     except ValueError as e:
         logger.error(f"User update failed: {e}")
@@ -1,24 +1,29 @@
 from datetime import datetime, timezone
 from uuid import uuid4
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logger_setup import get_logger
+from app.core.user_cache import user_id_cache
 from app.features.user.schemas import UserOnboardingCreate, UserProfileUpdate
 from app.features.auth.schemas import UserResponse
 from app.features.goal.schemas import GoalResponse
 from app.models.user import User
 from app.models.goal import Goal
+from .exceptions import OnboardingAlreadyCompletedException
 
 logger = get_logger(__name__)
 
 
-def complete_user_onboarding(
-    db: Session, onboarding_data: UserOnboardingCreate
+async def complete_user_onboarding(
+    db: AsyncSession, onboarding_data: UserOnboardingCreate
 ) -> tuple[UserResponse, GoalResponse]:
     """Complete user onboarding - add user fields and create first goal"""
-    user = db.query(User).filter(User.id == onboarding_data.id).first()
+    user = await db.scalar(select(User).where(User.id == onboarding_data.id))
     if not user:
-        raise ValueError(f"User with id {onboarding_data.id}")
+        raise ValueError(f"User with id {onboarding_data.id} does not exist")
+    if user.setup_completed:
+        raise OnboardingAlreadyCompletedException("Onboarding already completed")
 
     user.username = onboarding_data.username
     user.birthday = onboarding_data.birthday
@@ -43,9 +48,10 @@ def complete_user_onboarding(
         is_current=True,
     )
     db.add(goal)
-    db.commit()
-    db.refresh(user)
-    db.refresh(goal)
+    await db.commit()
+    await db.refresh(user)
+    await db.refresh(goal)
+    user_id_cache.invalidate(user.uid)
 
     logger.info(f"User onboarding completed for user_id={user.id} with goal_id={goal.uuid}")
 
@@ -62,9 +68,9 @@ def complete_user_onboarding(
         raise
 
 
-def update_user_data(db: Session, update_data: UserProfileUpdate) -> UserResponse:
+async def update_user_data(db: AsyncSession, update_data: UserProfileUpdate) -> UserResponse:
     """Update user profile data"""
-    user = db.query(User).filter(User.id == update_data.id).first()
+    user = await db.scalar(select(User).where(User.id == update_data.id))
     if not user:
         raise ValueError(f"User with id {update_data.id} does not exist")
 
@@ -83,8 +89,9 @@ def update_user_data(db: Session, update_data: UserProfileUpdate) -> UserRespons
 
     user.last_modified_at = datetime.now(timezone.utc)
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    user_id_cache.invalidate(user.uid)
 
     logger.info(f"User profile updated for user_id={user.id}")
 
@@ -1,4 +1,6 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
@@ -10,13 +12,29 @@ from app.features.goal.router import router as goal_router
 from app.features.meal.router import router as meal_router
 from app.features.product.router import router as product_router
 from app.features.ai.router import router as ai_router
+from app.features.ai.model_loader import model_loader
 
+from app.config import PRODUCT_CATALOG_REFRESH_SECONDS
+from app.core.database import AsyncSessionLocal
 from app.core.firebase import initialize_firebase
+from app.features.product.catalog import model_product_catalog, run_catalog_refresher
+from app.core.metrics import registry as metrics_registry
 from app.core.dependencies import verify_firebase_token, get_current_user_uid
 
 logger = get_logger(__name__, logging.DEBUG)
 
-app = FastAPI(title="CalCones API", description="API for CalCones app", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    model_loader.start()
+    catalog_refresher = asyncio.create_task(
+        run_catalog_refresher(model_product_catalog, AsyncSessionLocal, PRODUCT_CATALOG_REFRESH_SECONDS)
+    )
+    yield
+    catalog_refresher.cancel()
+
+
+app = FastAPI(title="CalCones API", description="API for CalCones app", version="1.0.0", lifespan=lifespan)
 
 app.include_router(auth_router)
 app.include_router(user_router)
@@ -40,6 +58,19 @@ async def read_root():
     return {"message": "Hello root"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe, 503 until every model is loaded and warmed up"""
+    report = model_loader.report()
+    return JSONResponse(status_code=status.HTTP_200_OK if report["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+                        content=report)
+
+
+@app.get("/metrics")
+async def metrics():
+    return metrics_registry.snapshot()
+
+
 @app.get("/test/")
 async def test():
     logger.error(f"Test error")
@@ -0,0 +1,23 @@
+"""
+Multi-worker deployment with shared model weights:
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app is imported and the models are built once in the master (preload_app),
+then forked into the workers, which share the weights copy-on-write instead of
+each loading their own copy. Check with `python -m app.features.ai.memory <master pid>`.
+"""
+
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = 120
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported, before any worker is forked
+    from app.features.ai.model_loader import model_loader
+
+    model_loader.preload()
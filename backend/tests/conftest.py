@@ -1,7 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
@@ -9,32 +8,34 @@ from app.core.database import Base
 from app.core.dependencies import get_db
 
 # SQLite db for tests
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
-engine = create_engine(
+engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 
 @pytest.fixture(scope="function")
-def db_session():
+async def db_session():
     """Creates clean database for each test"""
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
     session = TestingSessionLocal()
     try:
         yield session
     finally:
-        session.close()
-        Base.metadata.drop_all(bind=engine)
+        await session.close()
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
 
 
 @pytest.fixture(scope="function")
 def client(db_session):
 
-    def override_get_db():
+    async def override_get_db():
         try:
             yield db_session
         finally:
@@ -0,0 +1,129 @@
+import datetime
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from firebase_admin import auth
+
+from app.core.token_verifier import FirebaseTokenVerifier, PublicKeyCache
+
+PROJECT_ID = "cal-cones-test"
+
+
+def _key_pair() -> tuple:
+    """Private key and its self-signed PEM certificate, like the ones Google publishes"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.system.gserviceaccount.com")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    return key, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+KEY, CERT = _key_pair()
+
+
+def _token(uid="abcdefghijk", kid="kid-1", key=KEY, iat=None, exp_in=3600, audience=PROJECT_ID) -> str:
+    now = int(time.time())
+    iat = iat if iat is not None else now
+    claims = {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": audience,
+        "sub": uid,
+        "iat": iat,
+        "auth_time": iat,
+        "exp": now + exp_in,
+    }
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": kid})
+
+
+class FakeUsers:
+    """Stands in for auth.get_user, counting lookups"""
+
+    def __init__(self, tokens_valid_after_ms=0, disabled=False):
+        self.tokens_valid_after_ms = tokens_valid_after_ms
+        self.disabled = disabled
+        self.lookups = 0
+
+    def __call__(self, uid):
+        self.lookups += 1
+        return SimpleNamespace(uid=uid, tokens_valid_after_timestamp=self.tokens_valid_after_ms, disabled=self.disabled)
+
+
+def _verifier(users=None, fetches=None, **kwargs) -> FirebaseTokenVerifier:
+    def fetch():
+        if fetches is not None:
+            fetches.append(1)
+        return {"kid-1": CERT}, 3600
+
+    return FirebaseTokenVerifier(PROJECT_ID, PublicKeyCache(fetch), get_user=users or FakeUsers(), **kwargs)
+
+
+class TestFirebaseTokenVerifier:
+    """Tests FirebaseTokenVerifier"""
+
+    def test_valid_token_is_verified_once_then_cached(self):
+        fetches = []
+        users = FakeUsers()
+        verifier = _verifier(users, fetches)
+        token = _token()
+
+        first = verifier.verify(token)
+        second = verifier.verify(token)
+
+        assert first["uid"] == second["uid"] == "abcdefghijk"
+        assert len(fetches) == 1
+        assert users.lookups == 1
+        assert verifier.stats()["cached_tokens"] == 1
+
+    def test_rejects_tokens_not_signed_by_a_known_key(self):
+        other_key, _ = _key_pair()
+        verifier = _verifier()
+
+        with pytest.raises(auth.InvalidIdTokenError):
+            verifier.verify(_token(key=other_key))
+        with pytest.raises(auth.InvalidIdTokenError):
+            verifier.verify(_token(kid="unknown"))
+        with pytest.raises(auth.InvalidIdTokenError):
+            verifier.verify(_token(audience="another-project"))
+
+    def test_rejects_expired_tokens(self):
+        verifier = _verifier(clock_skew_seconds=0)
+
+        with pytest.raises(auth.ExpiredIdTokenError):
+            verifier.verify(_token(iat=int(time.time()) - 7200, exp_in=-10))
+
+    def test_revoked_and_disabled_users_are_rejected(self):
+        token = _token(iat=int(time.time()) - 60)
+
+        with pytest.raises(auth.RevokedIdTokenError):
+            _verifier(FakeUsers(tokens_valid_after_ms=int(time.time() * 1000))).verify(token)
+        with pytest.raises(auth.UserDisabledError):
+            _verifier(FakeUsers(disabled=True)).verify(token)
+
+    def test_stale_revocation_state_is_refreshed_in_background(self):
+        users = FakeUsers()
+        verifier = _verifier(users, revocation_interval=0, background_revocation=True)
+        token = _token(iat=int(time.time()) - 60)
+        verifier.verify(token)
+
+        users.tokens_valid_after_ms = int(time.time() * 1000)
+        verifier.verify(token)  # served from the cached state while the refresh runs
+        verifier._pool.submit(lambda: None).result()  # waits for the refresh
+
+        with pytest.raises(auth.RevokedIdTokenError):
+            verifier.verify(token)
+        assert users.lookups >= 2
@@ -0,0 +1,70 @@
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.core.dependencies import CurrentUser, get_current_user
+from app.core.user_cache import UserIdCache, user_id_cache
+from app.features.auth.schemas import UserCreate
+from app.features.auth.service import create_user_account, delete_user_account
+from app.models.user import User
+
+
+class TestUserIdCache:
+    """Tests UserIdCache"""
+
+    def test_entries_expire_after_ttl(self, monkeypatch):
+        cache = UserIdCache(max_entries=10, ttl_seconds=60)
+        now = 1000.0
+        monkeypatch.setattr("app.core.user_cache.time.monotonic", lambda: now)
+        cache.set("uid-1", 1)
+
+        assert cache.get("uid-1") == 1
+        now += 61
+        assert cache.get("uid-1") is None
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = UserIdCache(max_entries=2, ttl_seconds=60)
+        cache.set("uid-1", 1)
+        cache.set("uid-2", 2)
+        cache.get("uid-1")
+        cache.set("uid-3", 3)
+
+        assert cache.get("uid-1") == 1
+        assert cache.get("uid-2") is None
+        assert cache.get("uid-3") == 3
+
+
+class TestGetCurrentUser:
+    """Tests get_current_user dependency"""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        user_id_cache.clear()
+        yield
+        user_id_cache.clear()
+
+    async def test_resolves_user_once_then_from_cache(self, db_session, sample_user_data, monkeypatch):
+        await create_user_account(db_session, UserCreate(**sample_user_data))
+        user_id = await db_session.scalar(select(User.id).where(User.uid == sample_user_data["uid"]))
+
+        assert (await get_current_user(sample_user_data["uid"], db_session)).id == user_id
+        monkeypatch.setattr(db_session, "scalar", None)  # a second lookup would fail
+        assert await get_current_user(sample_user_data["uid"], db_session) == CurrentUser(user_id, sample_user_data["uid"])
+
+    async def test_unknown_user_is_not_found_and_not_cached(self, db_session, sample_user_data):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(sample_user_data["uid"], db_session)
+
+        assert exc_info.value.status_code == 404
+        assert user_id_cache.get(sample_user_data["uid"]) is None
+
+    async def test_deleted_user_is_invalidated(self, db_session, sample_user_data):
+        await create_user_account(db_session, UserCreate(**sample_user_data))
+        await get_current_user(sample_user_data["uid"], db_session)
+
+        await delete_user_account(db_session, sample_user_data["uid"])
+
+        assert user_id_cache.get(sample_user_data["uid"]) is None
+        with pytest.raises(HTTPException):
+            await get_current_user(sample_user_data["uid"], db_session)
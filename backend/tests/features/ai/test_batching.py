@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.features.ai.batching import MicroBatcher
+from app.features.ai.executor import InferenceExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = InferenceExecutor(max_workers=1, max_queue_size=4, name="test_batching")
+    yield executor
+    executor.shutdown()
+
+
+class TestMicroBatcher:
+    """Tests MicroBatcher"""
+
+    async def test_concurrent_items_share_one_batch(self, executor):
+        calls = []
+
+        def batch_fn(items, key):
+            calls.append(list(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(batch_fn, executor, max_batch_size=8, window_ms=20, name="test_share")
+
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+
+        assert results == [0, 2, 4]
+        assert calls == [[0, 1, 2]]
+
+    async def test_full_batch_is_flushed_before_window(self, executor):
+        calls = []
+
+        def batch_fn(items, key):
+            calls.append(len(items))
+            return items
+
+        batcher = MicroBatcher(batch_fn, executor, max_batch_size=2, window_ms=10_000, name="test_full")
+
+        results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(4))), timeout=2)
+
+        assert results == [0, 1, 2, 3]
+        assert calls == [2, 2]
+
+    async def test_items_with_different_keys_are_not_mixed(self, executor):
+        calls = []
+
+        def batch_fn(items, key):
+            calls.append((key, list(items)))
+            return items
+
+        batcher = MicroBatcher(batch_fn, executor, max_batch_size=8, window_ms=10, name="test_keys")
+
+        await asyncio.gather(batcher.submit("a", key=640), batcher.submit("b", key=1824))
+
+        assert sorted(calls) == [(640, ["a"]), (1824, ["b"])]
+
+    async def test_failed_item_only_fails_its_request(self, executor):
+        def batch_fn(items, key):
+            return [ValueError("bad image") if item == "bad" else item for item in items]
+
+        batcher = MicroBatcher(batch_fn, executor, max_batch_size=8, window_ms=10, name="test_isolation")
+
+        good, bad = await asyncio.gather(batcher.submit("good"), batcher.submit("bad"), return_exceptions=True)
+
+        assert good == "good"
+        assert isinstance(bad, ValueError)
@@ -0,0 +1,57 @@
+import json
+import time
+
+from app.features.ai.cache import DetectionResultCache
+
+OUTPUT = [{"pred_class_name": "apple", "det_conf_score": 0.9, "top5_cls_results": []}]
+
+
+class TestDetectionResultCache:
+    """Tests DetectionResultCache"""
+
+    def test_key_depends_on_content_and_params(self):
+        key = DetectionResultCache.make_key(b"image", 0.3, 1824, "v4")
+
+        assert key == DetectionResultCache.make_key(b"image", 0.3, 1824, "v4")
+        assert key != DetectionResultCache.make_key(b"other", 0.3, 1824, "v4")
+        assert key != DetectionResultCache.make_key(b"image", 0.3, 1024, "v4")
+        assert key != DetectionResultCache.make_key(b"image", 0.3, 1824, "v5")
+
+    def test_get_returns_copy_of_stored_value(self):
+        cache = DetectionResultCache(max_bytes=10_000, ttl_seconds=60, name="test_cache_copy")
+        cache.set("key", OUTPUT)
+
+        result = cache.get("key")
+        result[0]["pred_class_name"] = "pear"
+
+        assert cache.get("key") == OUTPUT
+        assert cache.get("missing") is None
+
+    def test_least_recently_used_entry_is_evicted(self):
+        entry_size = len(json.dumps(OUTPUT))
+        cache = DetectionResultCache(max_bytes=entry_size * 2, ttl_seconds=60, name="test_cache_lru")
+
+        cache.set("a", OUTPUT)
+        cache.set("b", OUTPUT)
+        cache.get("a")
+        cache.set("c", OUTPUT)
+
+        assert cache.get("a") == OUTPUT
+        assert cache.get("b") is None
+        assert cache.get("c") == OUTPUT
+
+    def test_expired_entry_is_a_miss(self):
+        cache = DetectionResultCache(max_bytes=10_000, ttl_seconds=0.01, name="test_cache_ttl")
+        cache.set("key", OUTPUT)
+
+        time.sleep(0.02)
+
+        assert cache.get("key") is None
+
+    def test_disk_tier_is_shared_between_instances(self, tmp_path):
+        writer = DetectionResultCache(max_bytes=10_000, ttl_seconds=60, disk_dir=str(tmp_path), name="test_cache_w")
+        reader = DetectionResultCache(max_bytes=10_000, ttl_seconds=60, disk_dir=str(tmp_path), name="test_cache_r")
+
+        writer.set("key", OUTPUT)
+
+        assert reader.get("key") == OUTPUT
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from AI.FoodDetection import FoodDetectionModel
+from app.features.ai import service
+from app.features.ai.cache import DetectionResultCache
+from app.features.ai.exceptions import DeadlineExceededException
+from app.features.ai.service import run_detection
+
+
+class _Probs:
+    top5 = [0]
+    top5conf = [0.8]
+
+
+class _ClsResult:
+    names = {0: "granny_smith"}
+    probs = _Probs()
+
+
+class SlowClassifier:
+    """Classifies every crop as "granny_smith", taking `seconds_per_crop`"""
+
+    def __init__(self, seconds_per_crop: float):
+        self.seconds_per_crop = seconds_per_crop
+
+    def predict(self, source, verbose=False):
+        time.sleep(self.seconds_per_crop * len(source))
+        return [_ClsResult() for _ in source]
+
+
+class _ClassifierManager:
+    def __init__(self, models: dict):
+        self.models = models
+
+    def has_model(self, group):
+        return group in self.models
+
+    def get_model(self, group):
+        return self.models[group]
+
+
+def _model(seconds_per_crop: float) -> FoodDetectionModel:
+    model = FoodDetectionModel.__new__(FoodDetectionModel)
+    model.cls_manager = _ClassifierManager({"fruit": SlowClassifier(seconds_per_crop)})
+    model._model_locks = {"fruit": threading.Lock()}
+    model._group_pool = None
+    model._cascade_lock = threading.Lock()
+    model.cascade_stats = {"fruit": {"classified": 0, "skipped": 0}}
+    model._seconds_per_crop = {}
+    model.set_cascade_policy()
+    model.name_to_id = {"apple": 1, "granny_smith": 2}
+    return model
+
+
+def _detections():
+    return [[(10, 10, 60, 60, 1, "apple", 0.7, "fruit"), (100, 100, 160, 160, 1, "apple", 0.6, "fruit")]]
+
+
+class TestClassifyDeadline:
+    """Tests FoodDetectionModel.classify with deadlines"""
+
+    def test_without_deadline_every_item_is_classified(self):
+        model = _model(0.01)
+        image = np.zeros((200, 200, 3), dtype=np.uint8)
+
+        outputs = model.classify([image], _detections(), deadlines=[None])[0]
+
+        assert [output["pred_class_name"] for output in outputs] == ["granny_smith"]
+        assert not any(output.get("degraded") for output in outputs)
+
+    def test_items_that_would_miss_the_deadline_keep_the_detector_class(self):
+        model = _model(0.05)
+        image = np.zeros((200, 200, 3), dtype=np.uint8)
+        model.classify([image], _detections())  # learns the classifier's seconds per crop
+
+        events = []
+        outputs = model.classify([image], _detections(), on_group_done=lambda group, top5: events.append(top5),
+                                 deadlines=[time.monotonic() + 0.05])[0]
+
+        assert [(output["pred_class_name"], output.get("degraded")) for output in outputs] == [("apple", True)]
+        assert events == [{(0, 0): [{"class_name": "apple", "probability": 0.7}],
+                           (0, 1): [{"class_name": "apple", "probability": 0.6}]}]
+
+
+class TestRunDetectionDeadline:
+    """Tests run_detection with an expired deadline"""
+
+    async def test_rejects_expired_deadline_before_detection(self, monkeypatch):
+        monkeypatch.setattr(service, "get_model", lambda: None)
+        monkeypatch.setattr(service, "detection_cache", DetectionResultCache(max_bytes=0, ttl_seconds=60))
+
+        with pytest.raises(DeadlineExceededException):
+            await run_detection(b"image", deadline=time.monotonic() - 1)
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.features.ai.executor import InferenceExecutor
+from app.features.ai.exceptions import InferenceQueueFullException
+
+
+class TestInferenceExecutor:
+    """Tests InferenceExecutor"""
+
+    async def test_run_returns_result(self):
+        executor = InferenceExecutor(max_workers=1, max_queue_size=1, name="test_exec_result")
+
+        result = await executor.run(lambda a, b=0: a + b, 2, b=3)
+
+        assert result == 5
+        executor.shutdown()
+
+    async def test_run_does_not_block_event_loop(self):
+        executor = InferenceExecutor(max_workers=1, max_queue_size=1, name="test_exec_loop")
+        release = threading.Event()
+
+        task = asyncio.create_task(executor.run(release.wait, 5))
+        await asyncio.sleep(0.01)
+
+        # Event loop is still responsive while the job is blocked on a worker
+        assert not task.done()
+        release.set()
+        assert await task is True
+        executor.shutdown()
+
+    async def test_run_rejects_when_queue_is_full(self):
+        executor = InferenceExecutor(max_workers=1, max_queue_size=1, name="test_exec_full")
+        release = threading.Event()
+
+        running = asyncio.create_task(executor.run(release.wait, 5))
+        queued = asyncio.create_task(executor.run(release.wait, 5))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(InferenceQueueFullException):
+            await executor.run(release.wait, 5)
+
+        release.set()
+        await asyncio.gather(running, queued)
+
+        # Slots are released once the jobs finish
+        assert await executor.run(lambda: "ok") == "ok"
+        executor.shutdown()
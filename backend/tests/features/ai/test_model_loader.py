@@ -0,0 +1,87 @@
+import pytest
+
+from app.features.ai import model_loader as model_loader_module
+
+from app.features.ai.model_loader import ModelLoader
+from app.features.ai.exceptions import ModelNotReadyException
+
+
+class FakeModel:
+    def __init__(self, fail_warm_up: bool = False):
+        self.fail_warm_up = fail_warm_up
+        self.warmed_up_at = None
+        self.shared = False
+
+    def warm_up(self, det_imgsizes):
+        if self.fail_warm_up:
+            raise RuntimeError("warm-up failed")
+        self.warmed_up_at = det_imgsizes
+
+    def share_memory(self):
+        self.shared = True
+
+    def get_states(self):
+        return {"detection": "loaded", "meat": "not_loaded"}
+
+
+class TestModelLoader:
+    """Tests ModelLoader"""
+
+    def test_not_ready_before_loading(self):
+        loader = ModelLoader(FakeModel, model_names=["detection", "meat"])
+
+        with pytest.raises(ModelNotReadyException):
+            loader.get()
+        assert loader.report() == {
+            "status": "pending",
+            "ready": False,
+            "error": None,
+            "models": {"detection": "not_loaded", "meat": "not_loaded"},
+        }
+
+    def test_load_warms_up_then_serves_the_model(self):
+        loader = ModelLoader(FakeModel, model_names=["detection", "meat"], warm_up_sizes=(640, 1824))
+
+        loader.load()
+
+        assert loader.ready
+        assert loader.get().warmed_up_at == (640, 1824)
+        assert loader.report()["models"] == {"detection": "loaded", "meat": "not_loaded"}
+
+    def test_failed_warm_up_still_serves_the_model(self):
+        loader = ModelLoader(lambda: FakeModel(fail_warm_up=True), model_names=["detection"])
+
+        loader.load()
+
+        assert loader.ready
+
+    def test_failed_build_is_reported(self):
+        def build():
+            raise FileNotFoundError("detection.pt")
+
+        loader = ModelLoader(build, model_names=["detection", "meat"])
+        loader.load()
+
+        report = loader.report()
+        assert report["status"] == "failed"
+        assert report["error"] == "detection.pt"
+        assert report["models"] == {"detection": "failed", "meat": "failed"}
+        with pytest.raises(ModelNotReadyException):
+            loader.get()
+
+    def test_preload_shares_weights_and_leaves_warm_up_to_workers(self, monkeypatch):
+        monkeypatch.setattr(model_loader_module.gc, "freeze", lambda: None)
+        loader = ModelLoader(FakeModel, model_names=["detection"], warm_up_sizes=(640,))
+
+        loader.preload()
+
+        assert loader.status == "preloaded"
+        assert loader._model.shared and loader._model.warmed_up_at is None
+        with pytest.raises(ModelNotReadyException):
+            loader.get()
+
+        loader.start()
+        loader._thread.join()
+
+        assert loader.ready
+        assert loader.get().warmed_up_at == (640,)
@@ -0,0 +1,51 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from AI.FoodDetection import FoodDetectionModel
+
+
+def _encode(width: int, height: int, fmt: str = "JPEG", orientation: int | None = None) -> bytes:
+    image = Image.new("RGB", (width, height), (200, 120, 40))
+    buffer = BytesIO()
+    if orientation is not None:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        image.save(buffer, fmt, exif=exif)
+    else:
+        image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class TestLoadImageReduced:
+    """Tests FoodDetectionModel.load_image_reduced"""
+
+    def test_picks_smallest_scale_covering_min_side(self):
+        content = _encode(4000, 3000)
+
+        image, scale = FoodDetectionModel.load_image_reduced(content, 1824)
+        assert scale == 2
+        assert image.shape == (1500, 2000, 3)
+
+        image, scale = FoodDetectionModel.load_image_reduced(content, 640)
+        assert scale == 4
+        assert image.shape == (750, 1000, 3)
+
+    def test_small_images_and_non_jpegs_decode_at_full_resolution(self):
+        image, scale = FoodDetectionModel.load_image_reduced(_encode(1000, 800), 1824)
+        assert scale == 1
+        assert image.shape == (800, 1000, 3)
+
+        image, scale = FoodDetectionModel.load_image_reduced(_encode(4000, 3000, fmt="PNG"), 640)
+        assert scale == 1
+        assert image.shape == (3000, 4000, 3)
+
+    def test_exif_orientation_is_applied(self):
+        content = _encode(4000, 3000, orientation=6)
+
+        image, scale = FoodDetectionModel.load_image_reduced(content, 640)
+
+        assert scale == 4
+        assert image.shape == (1000, 750, 3)
+        assert np.array_equal(image.shape, FoodDetectionModel.load_image(content)[::4, ::4].shape)
@@ -0,0 +1,71 @@
+import numpy as np
+
+from app.features.ai.resolution import ResolutionPolicy
+
+
+def _box(x1, y1, x2, y2, conf=0.9):
+    return (x1, y1, x2, y2, 1, "apple", conf, "fruit")
+
+
+class RecordingDetector:
+    """Returns canned detections per tier and records every detect call"""
+
+    def __init__(self, detections_by_tier: dict):
+        self.detections_by_tier = detections_by_tier
+        self.calls = []
+
+    def detect(self, images, conf_threshold, det_imgsz, verbose=False, timings=None):
+        self.calls.append((det_imgsz, len(images)))
+        return [list(self.detections_by_tier[det_imgsz]) for _ in images]
+
+
+def _policy():
+    return ResolutionPolicy(
+        ladder=(640, 1024, 1824),
+        max_boxes=8,
+        small_box_area=0.01,
+        small_box_fraction=0.3,
+        low_conf=0.5,
+        low_conf_fraction=0.5,
+    )
+
+
+class TestResolutionPolicy:
+    """Tests ResolutionPolicy"""
+
+    def test_max_tier_never_upscales_past_covering_tier(self):
+        policy = _policy()
+
+        assert policy.max_tier((480, 600, 3)) == 640
+        assert policy.max_tier((768, 1000, 3)) == 1024
+        assert policy.max_tier((3000, 4000, 3)) == 1824
+
+    def test_confident_large_boxes_keep_first_pass(self):
+        detector = RecordingDetector({640: [_box(0, 0, 1500, 1500)]})
+        images = [np.zeros((3000, 4000, 3), dtype=np.uint8)]
+
+        detections, tiers = _policy().detect(detector, images, 0.3)
+
+        assert tiers == [640]
+        assert detector.calls == [(640, 1)]
+        assert detections == [[_box(0, 0, 1500, 1500)]]
+
+    def test_small_boxes_escalate_to_highest_allowed_tier(self):
+        small = [_box(0, 0, 50, 50) for _ in range(3)]
+        detector = RecordingDetector({640: small, 1824: small + small})
+        images = [np.zeros((3000, 4000, 3), dtype=np.uint8)]
+
+        detections, tiers = _policy().detect(detector, images, 0.3)
+
+        assert tiers == [1824]
+        assert detector.calls == [(640, 1), (1824, 1)]
+        assert len(detections[0]) == 6
+
+    def test_low_confidence_escalation_is_capped_by_image_size(self):
+        uncertain = [_box(0, 0, 500, 500, conf=0.35)]
+        detector = RecordingDetector({640: uncertain, 1024: uncertain})
+        images = [np.zeros((768, 1000, 3), dtype=np.uint8), np.zeros((400, 600, 3), dtype=np.uint8)]
+
+        _, tiers = _policy().detect(detector, images, 0.3)
+
+        assert tiers == [1024, 640]
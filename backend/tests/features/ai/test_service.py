@@ -0,0 +1,112 @@
+from io import BytesIO
+
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+
+from app.features.ai import service
+from app.features.ai.cache import DetectionResultCache
+from app.features.ai.service import prepare_file_for_model, run_detection_batch, stream_detection
+from app.features.ai.exceptions import ImageTooLargeException
+
+
+def _upload(content: bytes) -> UploadFile:
+    return UploadFile(file=BytesIO(content), filename="image.png")
+
+
+def _png(width: int, height: int) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), color=(200, 100, 50)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestPrepareFileForModel:
+    """Tests prepare_file_for_model function"""
+
+    async def test_returns_image_bytes(self):
+        content = _png(64, 48)
+
+        result = await prepare_file_for_model(_upload(content))
+
+        assert result == content
+
+    async def test_rejects_invalid_image(self):
+        with pytest.raises(ValueError):
+            await prepare_file_for_model(_upload(b"definitely not an image"))
+
+    async def test_rejects_too_many_bytes(self, monkeypatch):
+        content = _png(64, 48)
+        monkeypatch.setattr(service, "MAX_UPLOAD_BYTES", len(content) - 1)
+
+        with pytest.raises(ImageTooLargeException):
+            await prepare_file_for_model(_upload(content))
+
+    async def test_rejects_too_many_pixels(self, monkeypatch):
+        monkeypatch.setattr(service, "MAX_IMAGE_PIXELS", 64 * 48 - 1)
+
+        with pytest.raises(ImageTooLargeException):
+            await prepare_file_for_model(_upload(_png(64, 48)))
+
+
+class TestRunDetectionBatch:
+    """Tests run_detection_batch function"""
+
+    @pytest.fixture(autouse=True)
+    def fake_pipeline(self, monkeypatch):
+        calls = []
+
+        def run_batch(images, key, deadlines=None):
+            calls.append(len(images))
+            return [{"outputs": [], "det_imgsz": image.pixels.shape[1], "timings": {"detection": 0.1}} for image in images]
+
+        monkeypatch.setattr(service, "_run_detection_batch", run_batch)
+        monkeypatch.setattr(service, "get_model", lambda: None)
+        monkeypatch.setattr(service, "detection_cache", DetectionResultCache(max_bytes=0, ttl_seconds=60))
+        return calls
+
+    async def test_runs_all_images_in_one_pass(self, fake_pipeline):
+        results = await run_detection_batch([_png(64, 48), _png(32, 48), _png(16, 48)])
+
+        assert fake_pipeline == [3]
+        assert [result["det_imgsz"] for result in results] == [64, 32, 16]
+
+    async def test_isolates_images_that_fail_to_decode(self, fake_pipeline):
+        results = await run_detection_batch([_png(64, 48), b"definitely not an image", _png(16, 48)])
+
+        assert fake_pipeline == [2]
+        assert results[0]["det_imgsz"] == 64
+        assert isinstance(results[1], ValueError)
+        assert results[2]["det_imgsz"] == 16
+
+
+class TestStreamDetection:
+    """Tests stream_detection function"""
+
+    @pytest.fixture(autouse=True)
+    def fake_pipeline(self, monkeypatch):
+        def run_streaming(image, emit):
+            if image == b"broken":
+                raise ValueError("Image buffer could not be decoded.")
+            emit({"event": "detections", "det_imgsz": 640, "items": [{"index": 0}, {"index": 1}]})
+            emit({"event": "classified", "index": 1, "cls_group": "fruit", "top5_cls_results": [{"class_name": "apple"}]})
+            emit({"event": "classified", "index": 0, "cls_group": "meat", "top5_cls_results": [{"class_name": "beef"}]})
+            return {"outputs": [{"top5_cls_results": [{"class_name": "beef"}]}], "det_imgsz": 640}
+
+        monkeypatch.setattr(service, "_run_streaming_detection", run_streaming)
+        monkeypatch.setattr(service, "get_model", lambda: None)
+        monkeypatch.setattr(service, "detection_cache", DetectionResultCache(max_bytes=0, ttl_seconds=60))
+        async def process_model_output(output, db):
+            return [[c["class_name"] for c in item["top5_cls_results"]] for item in output]
+
+        monkeypatch.setattr(service, "process_model_output", process_model_output)
+
+    async def test_emits_boxes_then_items_then_result(self):
+        events = [event async for event in stream_detection(b"image", db=None)]
+
+        assert [event["event"] for event in events] == ["detections", "classified", "classified", "result"]
+        assert [(event["index"], event["products"]) for event in events[1:3]] == [(1, ["apple"]), (0, ["beef"])]
+        assert events[-1]["results"] == [["beef"]]
+
+    async def test_raises_pipeline_errors(self):
+        with pytest.raises(ValueError):
+            [event async for event in stream_detection(b"broken", db=None)]
@@ -0,0 +1,68 @@
+import threading
+
+import numpy as np
+import torch
+
+from AI.FoodDetection import FoodDetectionModel
+
+
+class _Boxes:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Result:
+    def __init__(self, data):
+        self.boxes = _Boxes(data)
+
+
+class TiledDetector:
+    """Finds one apple at (100, 100, 200, 200) of every source, more confident on the whole image"""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, source, imgsz, **kwargs):
+        sources = source if isinstance(source, list) else [source]
+        self.batches.append([s.shape[:2] for s in sources])
+        return [_Result(torch.tensor([[100.0, 100.0, 200.0, 200.0, 0.9 if s.shape[1] > imgsz else 0.5, 1.0]]))
+                for s in sources]
+
+
+def _model(detector) -> FoodDetectionModel:
+    model = FoodDetectionModel.__new__(FoodDetectionModel)
+    model.detection_model = detector
+    model._model_locks = {None: threading.Lock()}
+    model._class_id_to_group = [None, "fruit"]
+    model.detection_id_to_name = {"0": "almonds", "1": "apple"}
+    return model
+
+
+class TestDetectTiled:
+    """Tests FoodDetectionModel.detect_tiled"""
+
+    def test_tile_starts_cover_the_image(self):
+        assert FoodDetectionModel._tile_starts(500, 640, 512) == [0]
+        assert FoodDetectionModel._tile_starts(1500, 640, 512) == [0, 512, 860]
+
+    def test_boxes_are_merged_in_image_coordinates(self):
+        detector = TiledDetector()
+        image = np.zeros((1000, 1500, 3), dtype=np.uint8)
+
+        detections = _model(detector).detect_tiled([image], tile_size=640, overlap=0.2, max_batch=4, verbose=False)[0]
+
+        # whole image + 3 x 2 tiles, 4 per detector call
+        assert [len(batch) for batch in detector.batches] == [4, 3]
+        # the top-left tile's box duplicates the whole-image box and is suppressed
+        assert sorted((d[0], d[1], d[6] > 0.8) for d in detections) == [
+            (100, 100, True), (100, 460, False), (612, 100, False), (612, 460, False), (960, 100, False),
+            (960, 460, False),
+        ]
+        assert {(d[5], d[7]) for d in detections} == {("apple", "fruit")}
+
+    def test_small_images_are_not_tiled(self):
+        detector = TiledDetector()
+
+        _model(detector).detect_tiled([np.zeros((480, 640, 3), dtype=np.uint8)], tile_size=640, verbose=False)
+
+        assert detector.batches == [[(480, 640)]]
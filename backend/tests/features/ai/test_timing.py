@@ -0,0 +1,35 @@
+from app.core.metrics import registry
+from app.features.ai.timing import StageTimings
+
+
+class TestStageTimings:
+    """Tests StageTimings"""
+
+    def test_add_accumulates_and_observes_histograms(self):
+        stage = registry.histogram("ai_stage_test_add_seconds")
+        crops = registry.histogram("ai_test_add_crops")
+        before = stage.count, crops.count
+        timings = StageTimings()
+
+        timings.add("test_add", 0.25, ("test_add_crops", 3))
+        timings.add("test_add", 0.5, ("test_add_crops", 2))
+
+        assert timings.stages == {"test_add": 0.75}
+        assert timings.counts == {"test_add_crops": 5}
+        assert (stage.count, crops.count) == (before[0] + 2, before[1] + 2)
+
+    def test_merge_does_not_observe_again(self):
+        histogram = registry.histogram("ai_stage_test_merge_seconds")
+        before = histogram.count
+        timings = StageTimings()
+
+        timings.merge({"test_merge": 0.1})
+
+        assert timings.stages == {"test_merge": 0.1}
+        assert histogram.count == before
+
+    def test_server_timing_header(self):
+        timings = StageTimings()
+        timings.merge({"detection": 0.0123, "cls_meat": 0.5})
+
+        assert timings.server_timing() == "detection;dur=12.3, cls_meat;dur=500.0"
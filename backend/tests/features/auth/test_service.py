@@ -1,5 +1,6 @@
 import pytest
 from datetime import datetime, timezone
+from sqlalchemy import select
 
 from app.features.auth.service import (
     create_user_account,
@@ -18,11 +19,11 @@ from app.models.user import User
 class TestCreateUserAccount:
     """Tests create_user_account function"""
 
-    def test_create_user_account_success(self, db_session, sample_user_data):
+    async def test_create_user_account_success(self, db_session, sample_user_data):
 
         user_credential = UserCreate(**sample_user_data)
 
-        result = create_user_account(db_session, user_credential)
+        result = await create_user_account(db_session, user_credential)
 
         # Assert
         assert result.uid == sample_user_data["uid"]
@@ -33,28 +34,28 @@ class TestCreateUserAccount:
 
         # Check if user is in the database
         db_user = (
-            db_session.query(User).filter(User.uid == sample_user_data["uid"]).first()
+            await db_session.scalar(select(User).where(User.uid == sample_user_data["uid"]))
         )
         assert db_user is not None
         assert db_user.email == sample_user_data["email"]
 
-    def test_create_user_account_duplicate_uid(self, db_session, sample_user_data):
+    async def test_create_user_account_duplicate_uid(self, db_session, sample_user_data):
 
         # Arrange - Create first user
         user_credential = UserCreate(**sample_user_data)
-        create_user_account(db_session, user_credential)
+        await create_user_account(db_session, user_credential)
 
         # Act & Assert - Try to create another user with same id
         with pytest.raises(UserAlreadyExistsException) as exc_info:
-            create_user_account(db_session, user_credential)
+            await create_user_account(db_session, user_credential)
 
         assert str(exc_info.value) == "User already exists"
 
-    def test_create_user_account_duplicate_email(self, db_session, sample_user_data):
+    async def test_create_user_account_duplicate_email(self, db_session, sample_user_data):
 
         # Arrange - Create first user
         user_credential_1 = UserCreate(**sample_user_data)
-        create_user_account(db_session, user_credential_1)
+        await create_user_account(db_session, user_credential_1)
 
         # Act & Assert - Try to create another user with different uid but same email
         user_credential_2 = UserCreate(
@@ -62,15 +63,15 @@ class TestCreateUserAccount:
         )
 
         with pytest.raises(UserAlreadyExistsException):
-            create_user_account(db_session, user_credential_2)
+            await create_user_account(db_session, user_credential_2)
 
-    def test_create_user_account_timestamps(self, db_session, sample_user_data):
+    async def test_create_user_account_timestamps(self, db_session, sample_user_data):
         # Arrange
         user_credential = UserCreate(**sample_user_data)
         before_creation = datetime.now()
 
         # Act
-        result = create_user_account(db_session, user_credential)
+        result = await create_user_account(db_session, user_credential)
         after_creation = datetime.now()
 
         # Assert
@@ -88,7 +89,7 @@ class TestPrivateHelperFunctions:
 
 class TestEdgeCases:
 
-    def test_create_user_with_empty_email(self, db_session):
+    async def test_create_user_with_empty_email(self, db_session):
 
         with pytest.raises(Exception):
             UserCreate(uid="test_uid", email="")
@@ -101,12 +102,12 @@ class TestEdgeCases:
             "test.user@subdomain.example.com",
         ],
     )
-    def test_create_user_with_various_email_formats(self, db_session, email):
+    async def test_create_user_with_various_email_formats(self, db_session, email):
         # Arrange
         user_credential = UserCreate(uid=f"uid_{email}", email=email)
 
         # Act
-        result = create_user_account(db_session, user_credential)
+        result = await create_user_account(db_session, user_credential)
 
         # Assert
         assert result.email == email
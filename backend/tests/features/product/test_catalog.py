@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from sqlalchemy import event
+
+from app.features.product.catalog import ModelProductCatalog
+from app.models.product import Product
+
+
+async def _add_product(db_session, name: str, name_from_model: str | None, from_model: bool = True) -> Product:
+    now = datetime.now(tz=timezone.utc)
+    product = Product(
+        uuid=uuid4(), user_id=1, name=name, manufacturer=None, kcal=100, carbs=1.0, protein=1.0, fat=1.0,
+        created_at=now, last_modified_at=now, from_model=from_model,
+        name_from_model=name_from_model, average_portion=None,
+    )
+    db_session.add(product)
+    await db_session.commit()
+    return product
+
+
+class _QueryCounter:
+    def __init__(self, db_session):
+        self.count = 0
+        self.engine = db_session.bind.sync_engine
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+class TestModelProductCatalog:
+    """Tests ModelProductCatalog"""
+
+    async def test_get_many_maps_names_without_queries_once_loaded(self, db_session):
+        await _add_product(db_session, "Apple", "apple")
+        await _add_product(db_session, "Banana", "banana")
+        await _add_product(db_session, "My apple", "apple_custom", from_model=False)
+        catalog = ModelProductCatalog()
+        await catalog.load(db_session)
+
+        with _QueryCounter(db_session) as queries:
+            products = await catalog.get_many(db_session, ["apple", "banana", "apple_custom", "unknown"])
+
+        assert queries.count == 0
+        assert products["apple"].name == "Apple"
+        assert products["banana"].name == "Banana"
+        assert products["apple_custom"] is None
+        assert products["unknown"] is None
+
+    async def test_invalidate_reloads_on_next_lookup(self, db_session):
+        catalog = ModelProductCatalog()
+        assert await catalog.get_many(db_session, ["apple"]) == {"apple": None}
+
+        await _add_product(db_session, "Apple", "apple")
+        assert await catalog.get_many(db_session, ["apple"]) == {"apple": None}
+
+        catalog.invalidate()
+        assert (await catalog.get_many(db_session, ["apple"]))["apple"].name == "Apple"
+
+    async def test_check_version_picks_up_external_changes(self, db_session):
+        product = await _add_product(db_session, "Apple", "apple")
+        catalog = ModelProductCatalog()
+        await catalog.load(db_session)
+
+        # Written by another worker, this catalog was never invalidated
+        product.name = "Green apple"
+        product.last_modified_at = product.last_modified_at + timedelta(seconds=1)
+        await db_session.commit()
+
+        await catalog.check_version(db_session)
+        assert (await catalog.get_many(db_session, ["apple"]))["apple"].name == "Green apple"